@@ -1,10 +1,11 @@
+import zlib
 import numpy as np
 from dataclasses import dataclass
 
 from smartscan.processor import BatchProcessor, ProcessorListener
 from smartscan.providers import ImageEmbeddingProvider, TextEmbeddingProvider
-from smartscan.embeddings import few_shot_classification, embed_image_file, embed_text_file, embed_video_file
-from smartscan.utils import are_valid_files
+from smartscan.embeddings import few_shot_classification, embed_image_file, embed_text_file, embed_video_file, load_shared_image
+from smartscan.utils import are_valid_files, get_file_type, check_cancelled
 from smartscan.errors import SmartScanError, ErrorCode
 from smartscan.constants import SupportedFileTypes
 
@@ -14,6 +15,80 @@ class ClassificationResult:
     item: str
     class_id: str
     similarity: float
+    # "first" when decided by the cascade's first stage, "full" otherwise
+    stage: str = "full"
+    # Cascade only: whether a full stage run was an audit, and whether both stages agreed
+    audited: bool = False
+    agreed: bool | None = None
+
+
+@dataclass
+class CascadeConfig:
+    """
+    Two stage classification of image and video files. A cheap encoder (e.g. a smaller or
+    quantized model) classifies first, and a file is only re-embedded with the full encoder
+    when the first stage is unsure: the margin between its top two classes is below
+    `min_margin`, or its best similarity is within `threshold_band` of the threshold.
+    `class_prototypes` must be in the cheap encoder's space; the classifier's prototypes are
+    used when the encoders share one. A random `audit_rate` fraction of confident items also
+    runs the full encoder, to measure agreement on the items the cascade does not escalate;
+    which items are audited depends only on `seed` and the path.
+    """
+    image_encoder: ImageEmbeddingProvider
+    class_prototypes: list[tuple[str, np.ndarray]] | None = None
+    similarity_threshold: float | None = None
+    min_margin: float = 0.05
+    threshold_band: float = 0.05
+    audit_rate: float = 0.0
+    seed: int = 0
+
+
+@dataclass
+class CascadeStats:
+    """
+    Counted from each item's outcome on the event loop, so it also covers items processed in
+    worker processes by a `ShardedProcessExecutor`.
+    """
+    first_stage: int = 0
+    # Items the first stage was unsure about, re-embedded with the full encoder
+    escalated: int = 0
+    escalated_agreed: int = 0
+    # Confident items also checked with the full encoder
+    audited: int = 0
+    audited_agreed: int = 0
+
+    def add(self, stage: str, audited: bool, agreed: bool | None):
+        if stage == "first":
+            self.first_stage += 1
+        elif audited:
+            self.audited += 1
+            self.audited_agreed += bool(agreed)
+        elif agreed is not None:
+            self.escalated += 1
+            self.escalated_agreed += agreed
+
+    @property
+    def total(self) -> int:
+        return self.first_stage + self.escalated + self.audited
+
+    @property
+    def first_stage_fraction(self) -> float:
+        """Fraction of items decided by the first stage alone."""
+        return self.first_stage / self.total if self.total else 0.0
+
+    @property
+    def full_stage_fraction(self) -> float:
+        """Fraction of items that ran the full encoder, escalated or audited."""
+        return (self.escalated + self.audited) / self.total if self.total else 0.0
+
+    @property
+    def escalated_agreement(self) -> float | None:
+        return self.escalated_agreed / self.escalated if self.escalated else None
+
+    @property
+    def audit_agreement(self) -> float | None:
+        """Estimated agreement of first stage decisions with the full encoder."""
+        return self.audited_agreed / self.audited if self.audited else None
 
 
 class FileClassifier(BatchProcessor[str, ClassificationResult]):
@@ -25,6 +100,7 @@ class FileClassifier(BatchProcessor[str, ClassificationResult]):
                 similarity_threshold: float,
                 n_frames_limit = 10,
                 n_chunks_limit = 5,
+                cascade: CascadeConfig | None = None,
                 **kwargs
                 ):
         super().__init__(listener=listener, **kwargs)
@@ -34,8 +110,23 @@ class FileClassifier(BatchProcessor[str, ClassificationResult]):
         self.similarity_threshold = similarity_threshold
         self.n_frames = n_frames_limit
         self.n_chunks = n_chunks_limit
+        self.cascade = cascade
+        self.cascade_stats = CascadeStats()
+        if cascade is not None:
+            first_prototypes = cascade.class_prototypes or class_prototypes
+            self._first_ids = [class_id for class_id, _ in first_prototypes]
+            self._first_matrix = np.stack([prototype for _, prototype in first_prototypes]).astype(np.float32)
+        self.valid_img_exts = SupportedFileTypes.IMAGE
+        self.valid_txt_exts = SupportedFileTypes.TEXT
+        self.valid_vid_exts = SupportedFileTypes.VIDEO
+
+    async def run(self, items):
+        self.cascade_stats = CascadeStats()
+        return await super().run(items)
 
     def on_process(self, item):
+        if self.cascade is not None and get_file_type(item) in ("image", "video"):
+            return self._classify_cascade(item)
         file_embedding = self._embed_file(item)
         destination_dir, best_similarity = few_shot_classification(file_embedding, self.class_prototypes)
         
@@ -43,13 +134,64 @@ class FileClassifier(BatchProcessor[str, ClassificationResult]):
             raise SmartScanError("Item unclassified", ErrorCode.BELOW_SIMILARITY_THRESHOLD)
 
         return ClassificationResult(item, destination_dir, best_similarity)
+
+    def _classify_cascade(self, item: str) -> ClassificationResult:
+        # Images are decoded once, covering both encoders, and kept for an escalated pass
+        image = None
+        if get_file_type(item) == "image":
+            image = load_shared_image(item, [self.cascade.image_encoder, self.image_encoder])
+        try:
+            return self._run_cascade(item, image)
+        finally:
+            if image is not None:
+                image.close()
+
+    def _cascade_embed(self, item: str, image, encoder: ImageEmbeddingProvider) -> np.ndarray:
+        if image is None:
+            return self._embed_file(item, encoder)
+        check_cancelled()
+        return encoder.embed(image)
+
+    def _is_audited(self, item: str) -> bool:
+        # A stable hash of the path, so audits do not depend on thread timing or item order
+        return zlib.crc32(f"{self.cascade.seed}:{item}".encode("utf-8")) / 2 ** 32 < self.cascade.audit_rate
+
+    def _run_cascade(self, item: str, image) -> ClassificationResult:
+        cascade = self.cascade
+        threshold = cascade.similarity_threshold if cascade.similarity_threshold is not None else self.similarity_threshold
+        similarities = self._first_matrix @ self._cascade_embed(item, image, cascade.image_encoder)
+        ranked = np.argsort(similarities)[::-1]
+        first_class, first_similarity = self._first_ids[ranked[0]], float(similarities[ranked[0]])
+        margin = first_similarity - float(similarities[ranked[1]]) if len(ranked) > 1 else np.inf
+        confident = margin >= cascade.min_margin and abs(first_similarity - threshold) >= cascade.threshold_band
+        audit = confident and cascade.audit_rate > 0 and self._is_audited(item)
+
+        if confident and not audit:
+            if first_similarity <= threshold:
+                raise SmartScanError("Item unclassified", ErrorCode.BELOW_SIMILARITY_THRESHOLD, {"stage": "first"})
+            return ClassificationResult(item, first_class, first_similarity, stage="first")
+
+        class_id, similarity = few_shot_classification(self._cascade_embed(item, image, self.image_encoder), self.class_prototypes)
+        # Outcomes agree when both stages pick the same class or both leave the item unclassified
+        first_outcome = first_class if first_similarity > threshold else None
+        agreed = first_outcome == (class_id if similarity > self.similarity_threshold else None)
+        if similarity <= self.similarity_threshold:
+            raise SmartScanError("Item unclassified", ErrorCode.BELOW_SIMILARITY_THRESHOLD, {"stage": "full", "audited": audit, "agreed": agreed})
+        return ClassificationResult(item, class_id, similarity, audited=audit, agreed=agreed)
     
     
     async def on_batch_complete(self, batch):
-        self.listener.on_batch_complete(batch)
+        for result in batch:
+            self.cascade_stats.add(result.stage, result.audited, result.agreed)
+        await self.listener.on_batch_complete(batch)
 
-    
-    def _embed_file(self, path: str) -> np.ndarray:
+    def on_item_error(self, item, error):
+        # Unclassified cascade items carry their outcome in the error details
+        if isinstance(error, SmartScanError) and error.code == ErrorCode.BELOW_SIMILARITY_THRESHOLD and isinstance(error.details, dict) and "stage" in error.details:
+            self.cascade_stats.add(error.details["stage"], error.details.get("audited", False), error.details.get("agreed"))
+
+    def _embed_file(self, path: str, image_encoder: ImageEmbeddingProvider | None = None) -> np.ndarray:
+        image_encoder = image_encoder or self.image_encoder
         is_image_file = are_valid_files(self.valid_img_exts, [path])
         is_text_file = are_valid_files(self.valid_txt_exts, [path])
         is_video_file = are_valid_files(self.valid_vid_exts, [path])
@@ -57,8 +199,8 @@ class FileClassifier(BatchProcessor[str, ClassificationResult]):
         if is_text_file:
             return embed_text_file(path, self.text_encoder, 128, self.n_chunks)
         elif is_image_file:
-            return embed_image_file(path, self.image_encoder)
+            return embed_image_file(path, image_encoder)
         elif is_video_file:
-            return embed_video_file(path, self.n_frames, self.image_encoder)
+            return embed_video_file(path, self.n_frames, image_encoder)
         raise SmartScanError("Unsupported file type", code=ErrorCode.UNSUPPORTED_FILE_TYPE, details=f"Supported file types: {SupportedFileTypes.IMAGE + SupportedFileTypes.TEXT + SupportedFileTypes.VIDEO}")
     
\ No newline at end of file
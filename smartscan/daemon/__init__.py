@@ -0,0 +1,2 @@
+from smartscan.daemon.server import EmbeddingDaemon, MODEL_PROVIDERS, DEFAULT_SOCKET_PATH
+from smartscan.daemon.client import DaemonClient, DaemonEmbedder
@@ -0,0 +1,3 @@
+from smartscan.daemon.server import main
+
+main()
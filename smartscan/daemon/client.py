@@ -0,0 +1,186 @@
+import socket
+import threading
+import numpy as np
+from typing import Generic, TypeVar
+from PIL import Image
+from tokenizers import Tokenizer
+
+from smartscan.daemon import protocol
+from smartscan.daemon.server import DEFAULT_SOCKET_PATH
+from smartscan.providers.embeddings.embedding_provider import EmbeddingProvider
+from smartscan.utils.image_utils import shrink_to_cover
+from smartscan.errors import SmartScanError, ErrorCode
+
+T = TypeVar("T")
+
+
+class DaemonClient():
+    """
+    Blocking client for `EmbeddingDaemon`. Each thread gets its own connection, so a client
+    can be shared by a processor's worker threads and their requests are served concurrently.
+    """
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float | None = None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._sockets: list[socket.socket] = []
+        self._lock = threading.Lock()
+
+    def embedding_dim(self, model: str) -> int:
+        return self.info(model)[0]
+
+    def info(self, model: str) -> tuple[int, tuple[int, int] | None, int | None]:
+        """(embedding_dim, input_size, max_len) of a served model."""
+        return protocol.decode_info(self._request(protocol.OP_INFO, model))
+
+    def tokenizer(self, model: str) -> Tokenizer | None:
+        data = self._request(protocol.OP_TOKENIZER, model)
+        return Tokenizer.from_str(bytes(data).decode("utf-8")) if len(data) else None
+
+    def embed_texts(self, model: str, texts: list[str]) -> np.ndarray:
+        embeddings, _ = protocol.decode_matrix(self._request(protocol.OP_EMBED_TEXT, model, protocol.encode_texts(texts)))
+        return embeddings
+
+    def embed_images(self, model: str, images: list[Image.Image | np.ndarray], input_size: tuple[int, int] | None = None) -> np.ndarray:
+        """With the model's `input_size`, images are shrunk to just cover it before sending."""
+        if input_size is not None:
+            arrays = [shrink_to_cover(image, input_size) for image in images]
+        else:
+            arrays = [np.asarray(image.convert("RGB")) if isinstance(image, Image.Image) else image for image in images]
+        embeddings, _ = protocol.decode_matrix(self._request(protocol.OP_EMBED_IMAGE, model, protocol.encode_images(arrays)))
+        return embeddings
+
+    def classify(self, prototype_set: str, embeddings: np.ndarray, k: int = 1) -> list[list[tuple[str, float]]]:
+        """Best `k` (class_id, similarity) pairs per embedding."""
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, np.shape(embeddings)[-1])
+        return protocol.decode_scored_labels(self._request(protocol.OP_CLASSIFY, prototype_set, protocol.encode_search(k, embeddings)))
+
+    def search(self, index: str, queries: np.ndarray, k: int = 10) -> list[list[tuple[str, float]]]:
+        """Top `k` (item_id, score) pairs per query."""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, np.shape(queries)[-1])
+        return protocol.decode_scored_labels(self._request(protocol.OP_SEARCH, index, protocol.encode_search(k, queries)))
+
+    def close(self):
+        with self._lock:
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            sock.close()
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError as e:
+                sock.close()
+                raise SmartScanError("Could not connect to daemon", code=ErrorCode.MODEL_NOT_LOADED, details=f"{self.socket_path}: {e}")
+            self._local.sock = sock
+            with self._lock:
+                self._sockets.append(sock)
+        return sock
+
+    def _request(self, op: int, name: str, payload: bytes = b"") -> memoryview:
+        sock = self._connection()
+        try:
+            sock.sendall(protocol.encode_request(op, name, payload))
+            status, length = protocol.RESPONSE_HEADER.unpack(self._recv_exactly(sock, protocol.RESPONSE_HEADER.size))
+            body = self._recv_exactly(sock, length)
+        except OSError:
+            # The connection is in an unknown state, the next request reconnects
+            self._local.sock = None
+            sock.close()
+            raise
+        if status != protocol.STATUS_OK:
+            code, message = protocol.decode_error(body)
+            raise SmartScanError(message, code=ErrorCode(code) if code in ErrorCode._value2member_map_ else None, details=name)
+        return body
+
+    @staticmethod
+    def _recv_exactly(sock: socket.socket, size: int) -> memoryview:
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            n = sock.recv_into(view[received:])
+            if n == 0:
+                raise ConnectionError("Daemon closed the connection")
+            received += n
+        return view
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DaemonEmbedder(EmbeddingProvider[T], Generic[T]):
+    """
+    `EmbeddingProvider` backed by a model served by `EmbeddingDaemon`, usable wherever a local
+    provider is, e.g. as the image or text encoder of `FileIndexer` and `FileClassifier`.
+    """
+    def __init__(self, model: str, client: DaemonClient | None = None, socket_path: str = DEFAULT_SOCKET_PATH):
+        self.model = model
+        self.client = client or DaemonClient(socket_path)
+        self._owns_client = client is None
+        self._embedding_dim: int | None = None
+        self._input_size: tuple[int, int] | None = None
+        self._max_len: int | None = None
+        self._tokenizer: Tokenizer | None = None
+        self._tokenizer_loaded = False
+
+    @property
+    def embedding_dim(self) -> int:
+        self._load_info()
+        return self._embedding_dim
+
+    # Same hints as the served provider, so files are decoded at reduced size and text is
+    # chunked by tokens on the client
+
+    @property
+    def input_size(self) -> tuple[int, int] | None:
+        self._load_info()
+        return self._input_size
+
+    @property
+    def max_len(self) -> int | None:
+        self._load_info()
+        return self._max_len
+
+    @property
+    def tokenizer(self) -> Tokenizer | None:
+        if not self._tokenizer_loaded:
+            self._tokenizer = self.client.tokenizer(self.model)
+            self._tokenizer_loaded = True
+        return self._tokenizer
+
+    def embed(self, data: T) -> np.ndarray:
+        return self.embed_batch([data])[0]
+
+    def embed_batch(self, data: list[T]) -> np.ndarray:
+        if not self.is_initialized(): raise SmartScanError("Model not loaded", code=ErrorCode.MODEL_NOT_LOADED, details="Call init method first")
+        if len(data) == 0:
+            return np.empty((0, self._embedding_dim), dtype=np.float32)
+        if isinstance(data[0], str):
+            return self.client.embed_texts(self.model, data)
+        return self.client.embed_images(self.model, data, self._input_size)
+
+    def init(self):
+        # Confirms the daemon is reachable and serves this model
+        self._embedding_dim = None
+        self._load_info()
+
+    def _load_info(self):
+        if self._embedding_dim is None:
+            self._embedding_dim, self._input_size, self._max_len = self.client.info(self.model)
+
+    def is_initialized(self) -> bool:
+        return self._embedding_dim is not None
+
+    def close_session(self):
+        self._embedding_dim = None
+        if self._owns_client:
+            self.client.close()
@@ -0,0 +1,151 @@
+import struct
+import numpy as np
+
+# Request: op (u8), target name length (u16), payload length (u32), then name and payload
+REQUEST_HEADER = struct.Struct("<BHI")
+# Response: status (u8), payload length (u32), then payload
+RESPONSE_HEADER = struct.Struct("<BI")
+_U32 = struct.Struct("<I")
+_U16 = struct.Struct("<H")
+_ARRAY_HEADER = struct.Struct("<IIB")
+_MATRIX_HEADER = struct.Struct("<II")
+_F32 = struct.Struct("<f")
+# embedding_dim, input width, input height, max_len; 0 when a provider has no such hint
+_INFO = struct.Struct("<IIII")
+
+OP_INFO = 1
+OP_EMBED_TEXT = 2
+OP_EMBED_IMAGE = 3
+OP_CLASSIFY = 4
+OP_SEARCH = 5
+OP_TOKENIZER = 6
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+
+def encode_request(op: int, name: str, payload: bytes = b"") -> bytes:
+    name_bytes = name.encode("utf-8")
+    return REQUEST_HEADER.pack(op, len(name_bytes), len(payload)) + name_bytes + payload
+
+
+def encode_response(status: int, payload: bytes = b"") -> bytes:
+    return RESPONSE_HEADER.pack(status, len(payload)) + payload
+
+
+def encode_texts(texts: list[str]) -> bytes:
+    parts = [_U32.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts.append(_U32.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def decode_texts(payload: memoryview) -> list[str]:
+    (count,), offset = _U32.unpack_from(payload, 0), _U32.size
+    texts = []
+    for _ in range(count):
+        (length,) = _U32.unpack_from(payload, offset)
+        offset += _U32.size
+        texts.append(bytes(payload[offset:offset + length]).decode("utf-8"))
+        offset += length
+    return texts
+
+
+def encode_images(images: list[np.ndarray]) -> bytes:
+    """uint8 HWC (or HW) arrays, sent as raw pixels."""
+    parts = [_U32.pack(len(images))]
+    for image in images:
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        channels = image.shape[2] if image.ndim == 3 else 0
+        parts.append(_ARRAY_HEADER.pack(image.shape[0], image.shape[1], channels))
+        parts.append(image.data)
+    return b"".join(parts)
+
+
+def decode_images(payload: memoryview) -> list[np.ndarray]:
+    (count,), offset = _U32.unpack_from(payload, 0), _U32.size
+    images = []
+    for _ in range(count):
+        height, width, channels = _ARRAY_HEADER.unpack_from(payload, offset)
+        offset += _ARRAY_HEADER.size
+        shape = (height, width, channels) if channels else (height, width)
+        size = height * width * max(channels, 1)
+        images.append(np.frombuffer(payload, dtype=np.uint8, count=size, offset=offset).reshape(shape))
+        offset += size
+    return images
+
+
+def encode_matrix(matrix: np.ndarray) -> bytes:
+    matrix = np.ascontiguousarray(matrix, dtype="<f4")
+    return _MATRIX_HEADER.pack(*matrix.shape) + matrix.data
+
+
+def decode_matrix(payload: memoryview, offset: int = 0) -> tuple[np.ndarray, int]:
+    rows, cols = _MATRIX_HEADER.unpack_from(payload, offset)
+    offset += _MATRIX_HEADER.size
+    matrix = np.frombuffer(payload, dtype="<f4", count=rows * cols, offset=offset).reshape(rows, cols)
+    return matrix, offset + matrix.nbytes
+
+
+def encode_scored_labels(results: list[list[tuple[str, float]]]) -> bytes:
+    """Per query, a list of (label, score)."""
+    parts = [_U32.pack(len(results))]
+    for labels in results:
+        parts.append(_U32.pack(len(labels)))
+        for label, score in labels:
+            data = label.encode("utf-8")
+            parts.append(_U16.pack(len(data)))
+            parts.append(data)
+            parts.append(_F32.pack(score))
+    return b"".join(parts)
+
+
+def decode_scored_labels(payload: memoryview) -> list[list[tuple[str, float]]]:
+    (count,), offset = _U32.unpack_from(payload, 0), _U32.size
+    results = []
+    for _ in range(count):
+        (n_labels,) = _U32.unpack_from(payload, offset)
+        offset += _U32.size
+        labels = []
+        for _ in range(n_labels):
+            (length,) = _U16.unpack_from(payload, offset)
+            offset += _U16.size
+            label = bytes(payload[offset:offset + length]).decode("utf-8")
+            offset += length
+            (score,) = _F32.unpack_from(payload, offset)
+            offset += _F32.size
+            labels.append((label, score))
+        results.append(labels)
+    return results
+
+
+def encode_search(k: int, queries: np.ndarray) -> bytes:
+    return _U32.pack(k) + encode_matrix(queries)
+
+
+def decode_search(payload: memoryview) -> tuple[int, np.ndarray]:
+    (k,) = _U32.unpack_from(payload, 0)
+    queries, _ = decode_matrix(payload, _U32.size)
+    return k, queries
+
+
+def encode_info(embedding_dim: int, input_size: tuple[int, int] | None = None, max_len: int | None = None) -> bytes:
+    width, height = input_size or (0, 0)
+    return _INFO.pack(embedding_dim, width, height, max_len or 0)
+
+
+def decode_info(payload: memoryview) -> tuple[int, tuple[int, int] | None, int | None]:
+    """(embedding_dim, input_size, max_len)"""
+    embedding_dim, width, height, max_len = _INFO.unpack_from(payload, 0)
+    return embedding_dim, (width, height) if width and height else None, max_len or None
+
+
+def encode_error(code: str, message: str) -> bytes:
+    return f"{code}\n{message}".encode("utf-8")
+
+
+def decode_error(payload: memoryview) -> tuple[str, str]:
+    code, _, message = bytes(payload).decode("utf-8").partition("\n")
+    return code, message
@@ -0,0 +1,202 @@
+import os
+import asyncio
+import argparse
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from smartscan.daemon import protocol
+from smartscan.providers import EmbeddingProvider, ClipImageEmbedder, ClipTextEmbedder, DinoSmallV2ImageEmbedder, InceptionResnetFaceEmbedder, MiniLmTextEmbedder
+from smartscan.search.searcher import SearchIndex
+from smartscan.prototypes import PrototypeStore
+from smartscan.search.topk import topk
+from smartscan.types import ModelName
+from smartscan.errors import SmartScanError, ErrorCode
+
+DEFAULT_SOCKET_PATH = os.path.join(os.environ.get("XDG_RUNTIME_DIR", "/tmp"), "smartscan.sock")
+
+MODEL_PROVIDERS: dict[ModelName, type[EmbeddingProvider]] = {
+    "clip-vit-b-32-image": ClipImageEmbedder,
+    "clip-vit-b-32-text": ClipTextEmbedder,
+    "dinov2-small": DinoSmallV2ImageEmbedder,
+    "inception-resnet-v1": InceptionResnetFaceEmbedder,
+    "all-minilm-l6-v2": MiniLmTextEmbedder,
+}
+
+
+class EmbeddingDaemon():
+    """
+    Keeps providers loaded and serves embedding, classification and search requests over
+    a Unix domain socket, so short-lived processes skip session creation and tokenizer loading.
+
+    Each connection handles one request at a time; requests from different connections run
+    concurrently on a thread pool. `providers` are keyed by the name clients ask for,
+    `class_prototypes` maps a name to (class_ids, prototypes) and `indexes` maps a name to a `SearchIndex`.
+    """
+    def __init__(self,
+                 socket_path: str = DEFAULT_SOCKET_PATH,
+                 providers: dict[str, EmbeddingProvider] | None = None,
+                 class_prototypes: dict[str, tuple[list[str], np.ndarray]] | None = None,
+                 indexes: dict[str, SearchIndex] | None = None,
+                 max_workers: int | None = None,
+                 ):
+        self.socket_path = socket_path
+        self.providers = providers or {}
+        self.class_prototypes = {name: (list(ids), np.asarray(prototypes, dtype=np.float32)) for name, (ids, prototypes) in (class_prototypes or {}).items()}
+        self.indexes = indexes or {}
+        self.pool = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1, thread_name_prefix="smartscan-daemon")
+        self._server: asyncio.AbstractServer | None = None
+        self._handlers = {
+            protocol.OP_INFO: self._info,
+            protocol.OP_EMBED_TEXT: self._embed_text,
+            protocol.OP_EMBED_IMAGE: self._embed_image,
+            protocol.OP_CLASSIFY: self._classify,
+            protocol.OP_SEARCH: self._search,
+            protocol.OP_TOKENIZER: self._tokenizer,
+        }
+
+    async def start(self):
+        for provider in self.providers.values():
+            if not provider.is_initialized():
+                provider.init()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        for provider in self.providers.values():
+            provider.close_session()
+        for index in self.indexes.values():
+            index.close()
+        self.pool.shutdown(wait=False)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(protocol.REQUEST_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    return
+                op, name_length, payload_length = protocol.REQUEST_HEADER.unpack(header)
+                body = memoryview(await reader.readexactly(name_length + payload_length))
+                name = bytes(body[:name_length]).decode("utf-8")
+                try:
+                    handler = self._handlers.get(op)
+                    if handler is None:
+                        raise SmartScanError("Unknown daemon operation", code=ErrorCode.INVALID_ARGUMENT, details=str(op))
+                    response = protocol.encode_response(protocol.STATUS_OK, await loop.run_in_executor(self.pool, handler, name, body[name_length:]))
+                except Exception as e:
+                    code = e.code.value if isinstance(e, SmartScanError) and e.code else ""
+                    message = e.message if isinstance(e, SmartScanError) else str(e)
+                    response = protocol.encode_response(protocol.STATUS_ERROR, protocol.encode_error(code, message))
+                writer.write(response)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _get(self, registry: dict, kind: str, name: str):
+        value = registry.get(name)
+        if value is None:
+            raise SmartScanError(f"Unknown {kind}", code=ErrorCode.INVALID_ARGUMENT, details=name)
+        return value
+
+    def _info(self, name: str, payload: memoryview) -> bytes:
+        provider = self._get(self.providers, "provider", name)
+        # Hints let clients decode images at reduced size and chunk text by tokens themselves
+        return protocol.encode_info(provider.embedding_dim, getattr(provider, "input_size", None), getattr(provider, "max_len", None))
+
+    def _tokenizer(self, name: str, payload: memoryview) -> bytes:
+        tokenizer = getattr(self._get(self.providers, "provider", name), "tokenizer", None)
+        # Serialised `tokenizers.Tokenizer`; empty for providers without one
+        return tokenizer.to_str().encode("utf-8") if tokenizer is not None else b""
+
+    def _embed_text(self, name: str, payload: memoryview) -> bytes:
+        provider = self._get(self.providers, "provider", name)
+        return protocol.encode_matrix(provider.embed_batch(protocol.decode_texts(payload)))
+
+    def _embed_image(self, name: str, payload: memoryview) -> bytes:
+        provider = self._get(self.providers, "provider", name)
+        # Image providers take the decoded uint8 arrays as they are
+        return protocol.encode_matrix(provider.embed_batch(protocol.decode_images(payload)))
+
+    def _classify(self, name: str, payload: memoryview) -> bytes:
+        class_ids, prototypes = self._get(self.class_prototypes, "prototype set", name)
+        k, embeddings = protocol.decode_search(payload)
+        indices, scores = topk(embeddings @ prototypes.T, k)
+        return protocol.encode_scored_labels([[(class_ids[i], float(s)) for i, s in zip(row, row_scores)] for row, row_scores in zip(indices, scores)])
+
+    def _search(self, name: str, payload: memoryview) -> bytes:
+        index = self._get(self.indexes, "index", name)
+        k, queries = protocol.decode_search(payload)
+        indices, scores = index.search(queries, k)
+        return protocol.encode_scored_labels([[(index.ids[i], float(s)) for i, s in zip(row, row_scores)] for row, row_scores in zip(indices, scores)])
+
+
+def _parse_pairs(values: list[str], option: str) -> dict[str, str]:
+    pairs = {}
+    for value in values:
+        name, sep, path = value.partition("=")
+        if not sep:
+            raise SmartScanError(f"Expected NAME=PATH for {option}", code=ErrorCode.INVALID_ARGUMENT, details=value)
+        pairs[name] = path
+    return pairs
+
+
+def load_class_prototypes(path: str) -> tuple[list[str], np.ndarray]:
+    """Load an .npz file with `class_ids` and `prototypes` arrays, or one saved by `PrototypeStore`."""
+    with np.load(path) as f:
+        if "prototypes" not in f.files:
+            return PrototypeStore.load(path).matrix()
+        return [str(class_id) for class_id in f["class_ids"]], f["prototypes"].astype(np.float32)
+
+
+def load_search_index(path: str) -> SearchIndex:
+    """Load an .npz file with `ids` and `embeddings` arrays."""
+    with np.load(path) as f:
+        return SearchIndex([str(item) for item in f["ids"]], f["embeddings"].astype(np.float32))
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="smartscan-daemon", description="Serve SmartScan embeddings over a Unix domain socket.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Socket path")
+    parser.add_argument("--model", action="append", default=[], metavar="NAME=PATH", help=f"Model to keep loaded, NAME is one of {', '.join(MODEL_PROVIDERS)}")
+    parser.add_argument("--prototypes", action="append", default=[], metavar="NAME=PATH", help="Class prototypes (.npz with class_ids, prototypes, or a saved PrototypeStore)")
+    parser.add_argument("--index", action="append", default=[], metavar="NAME=PATH", help="Search index (.npz with ids, embeddings)")
+    parser.add_argument("--workers", type=int, default=None, help="Request worker threads")
+    args = parser.parse_args(argv)
+
+    providers = {}
+    for name, path in _parse_pairs(args.model, "--model").items():
+        if name not in MODEL_PROVIDERS:
+            parser.error(f"unknown model {name}")
+        providers[name] = MODEL_PROVIDERS[name](path)
+    class_prototypes = {name: load_class_prototypes(path) for name, path in _parse_pairs(args.prototypes, "--prototypes").items()}
+    indexes = {name: load_search_index(path) for name, path in _parse_pairs(args.index, "--index").items()}
+
+    daemon = EmbeddingDaemon(args.socket, providers, class_prototypes, indexes, args.workers)
+
+    async def serve():
+        try:
+            await daemon.serve_forever()
+        finally:
+            await daemon.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
@@ -1,8 +1,10 @@
 
 import numpy as np
 import pickle
+from dataclasses import dataclass, field
 from PIL import Image
-from smartscan.utils import get_frames_from_video, read_text_file
+from smartscan.utils import read_text_file, load_image, iter_token_chunks, sample_token_chunks, probe_video, iter_video_frames, frame_signature, frame_difference, check_cancelled
+from smartscan.errors import SmartScanError, ErrorCode
 from smartscan.providers import ImageEmbeddingProvider, TextEmbeddingProvider
 
 # embeddings (b, dim)
@@ -13,33 +15,229 @@ def generate_prototype_embedding(embeddings: np.ndarray) -> np.ndarray:
     return prototype
 
 
-def embed_video_file(path: str, n_frames: int, embedder: ImageEmbeddingProvider):
-    frame_arrs = get_frames_from_video(path, n_frames)
-    frame_images = [Image.fromarray(frame) for frame in frame_arrs]
-    batch = embedder.embed_batch(frame_images)
-    return generate_prototype_embedding(batch)
+@dataclass
+class VideoSegment:
+    start: float
+    end: float
+    embedding: np.ndarray
+    n_frames: int
+
+
+@dataclass
+class VideoEmbedding:
+    embedding: np.ndarray
+    segments: list[VideoSegment] = field(default_factory=list)
+    frames_sampled: int = 0
+    frames_embedded: int = 0
+
+
+def embed_video_file(path: str, n_frames: int, embedder: ImageEmbeddingProvider, diff_threshold: float = 0.02):
+    """Embed `n_frames` evenly spaced frames, skipping those nearly identical to the last embedded one."""
+    probe = probe_video(path)
+    fps = n_frames / max(probe[2], 1e-3)
+    return embed_video_stream(path, embedder, sample_fps=fps, diff_threshold=diff_threshold, probe=probe).embedding
+
+
+def embed_video_stream(path: str,
+                       embedder: ImageEmbeddingProvider,
+                       sample_fps: float = 1.0,
+                       diff_threshold: float = 0.02,
+                       scene_threshold: float = 0.15,
+                       batch_size: int = 8,
+                       max_frames: int | None = None,
+                       keep_segments: bool = False,
+                       probe: tuple[int, int, float] | None = None,
+                       ) -> VideoEmbedding:
+    """
+    Embed a video from a stream of frames sampled at `sample_fps`, so memory stays bounded
+    by `batch_size` frames. Frames whose signature differs from the last embedded frame by
+    less than `diff_threshold` are not embedded; they count towards that frame's weight so
+    the result still approximates the mean over all sampled frames. A difference above
+    `scene_threshold` starts a new segment, and with `keep_segments` a normalised embedding
+    is kept per segment for temporal search. `max_frames` caps how many frames are embedded.
+    """
+    if max_frames is not None and max_frames < 1:
+        raise SmartScanError("max_frames must be at least 1", code=ErrorCode.INVALID_ARGUMENT)
+    probe = probe or probe_video(path)
+    total = np.zeros(embedder.embedding_dim, dtype=np.float64)
+    segments: list[list] = [] # [start, embedding sum, embedded frames]
+    pending: list[list] = [] # [frame, weight, segment]
+    last_embedding: np.ndarray | None = None
+    last_signature: np.ndarray | None = None
+    frames_sampled = frames_embedded = 0
+
+    def flush():
+        nonlocal last_embedding, frames_embedded
+        if not pending:
+            return
+        check_cancelled()
+        # Frames share one size, so providers resize them as one NHWC batch
+        embeddings = embedder.embed_batch(np.stack([frame for frame, _, _ in pending]))
+        for embedding, (_, weight, segment) in zip(embeddings, pending):
+            total[:] += weight * embedding
+            segment[1] += weight * embedding
+        last_embedding = embeddings[-1]
+        frames_embedded += len(pending)
+        pending.clear()
+
+    frames = iter_video_frames(path, sample_fps, getattr(embedder, "input_size", None), probe)
+    try:
+        for timestamp, frame in frames:
+            frames_sampled += 1
+            signature = frame_signature(frame)
+            difference = 1.0 if last_signature is None else frame_difference(signature, last_signature)
+            if difference < diff_threshold or (max_frames is not None and frames_embedded + len(pending) >= max_frames):
+                # Stands in for the last embedded frame
+                if pending:
+                    pending[-1][1] += 1
+                else:
+                    total[:] += last_embedding
+                    segments[-1][1] += last_embedding
+                continue
+
+            if not segments or difference >= scene_threshold:
+                segments.append([timestamp, np.zeros_like(total), 0])
+            segments[-1][2] += 1
+            last_signature = signature
+            pending.append([frame, 1, segments[-1]])
+            if len(pending) >= batch_size:
+                flush()
+        flush()
+    finally:
+        frames.close()
+
+    if frames_embedded == 0:
+        raise SmartScanError("No frames could be read from video", code=ErrorCode.INVALID_ARGUMENT, details=path)
+
+    end = frames_sampled / sample_fps
+    video_segments = []
+    if keep_segments:
+        for i, (start, sums, count) in enumerate(segments):
+            segment_end = segments[i + 1][0] if i + 1 < len(segments) else end
+            video_segments.append(VideoSegment(start, segment_end, (sums / np.linalg.norm(sums)).astype(np.float32), count))
+    return VideoEmbedding((total / np.linalg.norm(total)).astype(np.float32), video_segments, frames_sampled, frames_embedded)
 
 
 def embed_video_files(paths: list[str], n_frames: int, embedder: ImageEmbeddingProvider):
     return np.stack([embed_video_file(path, n_frames, embedder) for path in paths], axis=0)
 
 
-def embed_image_file(path: str, embedder: ImageEmbeddingProvider):
-    return embedder.embed(Image.open(path))
+def embed_image_file(path: str, embedder: ImageEmbeddingProvider, reduced_decode: bool = True):
+    with load_image(path, _decode_size(embedder, reduced_decode)) as image:
+        image.load()
+        # Skip inference when decoding already used up the item's time budget
+        check_cancelled()
+        return embedder.embed(image)
+
+
+def embed_image_files(paths: list[str], embedder: ImageEmbeddingProvider, reduced_decode: bool = True):
+    images = [load_image(path, _decode_size(embedder, reduced_decode)) for path in paths]
+    try:
+        for image in images:
+            image.load()
+        check_cancelled()
+        return embedder.embed_batch(images)
+    finally:
+        for image in images:
+            image.close()
+
+
+def load_shared_image(path: str, embedders: list[ImageEmbeddingProvider], reduced_decode: bool = True) -> Image.Image:
+    """
+    Decode an image once as RGB, downscaled to the smallest size that still covers the
+    `input_size` of every embedder, so each can derive its own input from it cheaply.
+    """
+    size = _shared_input_size(embedders) if reduced_decode else None
+    with load_image(path, size) as image:
+        image = image.convert("RGB")
+    if size is None:
+        return image
+    w, h = image.size
+    scale = max(size[0] / w, size[1] / h)
+    if scale >= 1:
+        return image
+    return image.resize((max(size[0], round(w * scale)), max(size[1], round(h * scale))), Image.BICUBIC, reducing_gap=3.0)
+
+
+def embed_image_file_multi(path: str, embedders: dict[str, ImageEmbeddingProvider], reduced_decode: bool = True) -> dict[str, np.ndarray]:
+    """Embed one image file with several encoders, decoding it only once. Returns name -> embedding."""
+    with load_shared_image(path, list(embedders.values()), reduced_decode) as image:
+        embeddings = {}
+        for name, embedder in embedders.items():
+            check_cancelled()
+            embeddings[name] = embedder.embed(image)
+        return embeddings
+
+
+def _shared_input_size(embedders: list[ImageEmbeddingProvider]) -> tuple[int, int] | None:
+    sizes = [getattr(embedder, "input_size", None) for embedder in embedders]
+    # An embedder without a known input size needs the full resolution image
+    if not sizes or any(size is None for size in sizes):
+        return None
+    return max(size[0] for size in sizes), max(size[1] for size in sizes)
+
+
+def check_reduced_decode_accuracy(paths: list[str], embedder: ImageEmbeddingProvider) -> np.ndarray:
+    """Cosine similarity between embeddings from reduced resolution and full resolution decoding, per file."""
+    reduced = embed_image_files(paths, embedder, reduced_decode=True)
+    full = embed_image_files(paths, embedder, reduced_decode=False)
+    return np.sum(reduced * full, axis=1)
+
+
+def _decode_size(embedder: ImageEmbeddingProvider, reduced_decode: bool) -> tuple[int, int] | None:
+    return getattr(embedder, "input_size", None) if reduced_decode else None
+
+
+def embed_text_file(path: str, embedder: TextEmbeddingProvider, max_tokenizer_length=128, max_chunks=5, overlap=0):
+    return embed_text_files([path], embedder, max_tokenizer_length, max_chunks, overlap)[0]
+
+
+def embed_text_files(paths: list[str], embedder: TextEmbeddingProvider, max_tokenizer_length=128, max_chunks=5, overlap=0, batch_size=32):
+    """
+    Embed text files as the normalised mean of their chunk embeddings.
+    Chunks from all files share `embed_batch` calls of up to `batch_size`. With `max_chunks=None`
+    every chunk of each file is embedded while only a running sum is kept per file.
+    """
+    sums = np.zeros((len(paths), embedder.embedding_dim), dtype=np.float32)
+    pending_chunks: list[str] = []
+    pending_owners: list[int] = []
 
+    def flush():
+        if not pending_chunks:
+            return
+        check_cancelled()
+        embeddings = embedder.embed_batch(pending_chunks)
+        np.add.at(sums, pending_owners, embeddings)
+        pending_chunks.clear()
+        pending_owners.clear()
 
-def embed_image_files(paths: list[str], embedder: ImageEmbeddingProvider):
-    return embedder.embed_batch([Image.open(path) for path in paths])
+    for index, path in enumerate(paths):
+        for chunk in iter_file_chunks(path, embedder, max_tokenizer_length, max_chunks, overlap):
+            pending_chunks.append(chunk)
+            pending_owners.append(index)
+            if len(pending_chunks) >= batch_size:
+                flush()
+    flush()
 
+    norms = np.linalg.norm(sums, axis=1, keepdims=True)
+    if np.any(norms == 0):
+        raise SmartScanError("No text to embed", code=ErrorCode.PROTOTYPE_GENERATION_ERROR, details=[path for path, norm in zip(paths, norms) if norm == 0])
+    return sums / norms
 
-def embed_text_file(path: str, embedder: TextEmbeddingProvider, max_tokenizer_length=128, max_chunks=5):
-    chunks = chunk_text(read_text_file(path), max_tokenizer_length, max_chunks)
-    chunk_embeddings = embedder.embed_batch(chunks)
-    return generate_prototype_embedding(chunk_embeddings)
 
+def iter_file_chunks(path: str, embedder: TextEmbeddingProvider, max_tokenizer_length=128, max_chunks=5, overlap=0):
+    tokenizer = getattr(embedder, "tokenizer", None)
+    if tokenizer is None:
+        # Providers without an exposed tokenizer fall back to character chunking
+        yield from chunk_text(read_text_file(path), max_tokenizer_length, max_chunks or 10)
+        return
 
-def embed_text_files(paths: list[str], embedder: TextEmbeddingProvider, max_tokenizer_length=128, max_chunks=5):
-    return np.stack([embed_text_file(path, embedder, max_tokenizer_length, max_chunks) for path in paths], axis=0)
+    # Leave room for the special tokens the provider adds around each chunk
+    max_tokens = min(max_tokenizer_length, getattr(embedder, "max_len", None) or max_tokenizer_length) - 2
+    if max_chunks is None:
+        yield from iter_token_chunks(path, tokenizer, max_tokens, overlap)
+    else:
+        yield from sample_token_chunks(path, tokenizer, max_tokens, max_chunks, overlap)
 
 
 def few_shot_classification(item_embedding:  np.ndarray, class_prototypes: list[tuple[str, np.ndarray]]) -> tuple[str, float]:
@@ -57,7 +255,7 @@ def few_shot_classification(item_embedding:  np.ndarray, class_prototypes: list[
 
 
 def chunk_text(s: str, tokenizer_max_length: int, limit: int = 10):
-    max_chunks = len(s) // 4 * tokenizer_max_length
+    max_chunks = -(-len(s) // tokenizer_max_length)
     n_chunks = min(limit, max_chunks)
     chunks = []
     start = 0
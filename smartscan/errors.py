@@ -11,6 +11,9 @@ class ErrorCode(Enum):
     MODEL_NOT_LOADED = "MODEL_NOT_LOADED"
     INVALID_ARGUMENT = "INVALID_ARGUMENT"
     PROTOTYPE_GENERATION_ERROR = "PROTOTYPE_GENERATION_ERROR"
+    WORKER_FAILED = "WORKER_FAILED"
+    JOB_CANCELLED = "JOB_CANCELLED"
+    TIMEOUT = "TIMEOUT"
 
 class SmartScanError(Exception):
     """Base class for all SmartScan related errors."""
@@ -22,3 +25,7 @@ class SmartScanError(Exception):
         self.code = code
         self.details = details
         super().__init__(message)
+
+    # Keep code and details when errors cross process boundaries
+    def __reduce__(self):
+        return (self.__class__, (self.message, self.code, self.details))
@@ -1,9 +1,11 @@
+import asyncio
 import numpy as np
 
 from smartscan.processor import BatchProcessor, ProcessorListener
-from smartscan.utils import are_valid_files
-from smartscan.embeddings import embed_video_file, embed_text_file, embed_image_file
-from smartscan.providers import ImageEmbeddingProvider, TextEmbeddingProvider
+from smartscan.utils import are_valid_files, get_file_type
+from smartscan.embeddings import embed_video_file, embed_text_file, embed_image_file, embed_image_file_multi
+from smartscan.providers import ImageEmbeddingProvider, TextEmbeddingProvider, CoalescingEmbedder
+from smartscan.search.reduction import DimensionReducer
 from smartscan.errors import SmartScanError, ErrorCode
 from smartscan.constants import SupportedFileTypes
 
@@ -15,6 +17,7 @@ class FileIndexer(BatchProcessor[str, tuple[str, np.ndarray]]):
                 n_frames: int = 10,
                 n_chunks: int = 5,
                 listener = ProcessorListener[str, tuple[str, np.ndarray]],
+                reducers: dict[str, DimensionReducer] | None = None,
                 **kwargs
                 ):
         super().__init__(listener=listener, **kwargs)
@@ -22,6 +25,12 @@ class FileIndexer(BatchProcessor[str, tuple[str, np.ndarray]]):
         self.text_encoder = text_encoder
         self.n_frames = n_frames
         self.n_chunks = n_chunks
+        # Optional fitted reducers per file type ("image", "text", "video"), applied to each completed
+        # batch before it reaches the listener; each must be fitted in its encoder's space
+        self.reducers = dict(reducers or {})
+        if "image" in self.reducers:
+            # Videos are embedded with the image encoder
+            self.reducers.setdefault("video", self.reducers["image"])
         self.valid_img_exts = ('.png', '.jpg', '.jpeg', '.bmp', '.webp')
         self.valid_txt_exts = ('.txt', '.md', '.rst', '.html', '.json')
         self.valid_vid_exts = ('.mp4', '.mkv', '.webm')
@@ -32,8 +41,23 @@ class FileIndexer(BatchProcessor[str, tuple[str, np.ndarray]]):
              
     # delegate to lister e.g to handle storage
     async def on_batch_complete(self, batch):
+        if self.reducers and batch:
+            batch = await asyncio.to_thread(self._reduce_batch, batch)
         await self.listener.on_batch_complete(batch)
 
+    def _reduce_batch(self, batch: list[tuple[str, np.ndarray]]) -> list[tuple[str, np.ndarray]]:
+        # Image and text embeddings live in different spaces, so each file type is reduced on its own
+        rows: dict[str, list[int]] = {}
+        for i, (item, _) in enumerate(batch):
+            file_type = get_file_type(item)
+            if file_type in self.reducers:
+                rows.setdefault(file_type, []).append(i)
+        batch = list(batch)
+        for file_type, indices in rows.items():
+            reduced = self.reducers[file_type].transform(np.stack([batch[i][1] for i in indices]))
+            for i, embedding in zip(indices, reduced):
+                batch[i] = (batch[i][0], embedding)
+        return batch
 
     def _embed_file(self, path: str) -> np.ndarray:
         is_image_file = are_valid_files(self.valid_img_exts, [path])
@@ -48,4 +72,49 @@ class FileIndexer(BatchProcessor[str, tuple[str, np.ndarray]]):
             return embed_video_file(path, self.n_frames, self.image_encoder)
         raise SmartScanError("Unsupported file type", code=ErrorCode.UNSUPPORTED_FILE_TYPE, details=f"Supported file types: {SupportedFileTypes.IMAGE + SupportedFileTypes.TEXT + SupportedFileTypes.VIDEO}")
     
-        
\ No newline at end of file
+        
+
+
+class MultiEncoderImageIndexer(BatchProcessor[str, tuple[str, dict[str, np.ndarray]]]):
+    """
+    Indexes images with several encoders at once, e.g. CLIP for search and DINO for
+    deduplication. Each file is decoded once in `on_process` into a shared RGB image
+    covering every encoder's input size, which every encoder then embeds in the same
+    worker, so timeouts, cancellation and the concurrency limit cover the inference too.
+    The listener receives (item, {encoder name: embedding}) pairs. With `coalesce`, each
+    encoder is wrapped in a `CoalescingEmbedder`, so the files of a batch processed
+    concurrently share one batched inference call per encoder.
+    """
+    def __init__(self,
+                encoders: dict[str, ImageEmbeddingProvider],
+                listener = ProcessorListener[str, tuple[str, dict[str, np.ndarray]]],
+                reduced_decode: bool = True,
+                coalesce: bool = True,
+                **kwargs
+                ):
+        super().__init__(listener=listener, **kwargs)
+        self.encoders = encoders
+        if coalesce:
+            self.encoders = {
+                name: encoder if isinstance(encoder, CoalescingEmbedder) else CoalescingEmbedder(encoder, max_batch_size=self.batch_size)
+                for name, encoder in encoders.items()
+            }
+        self.reduced_decode = reduced_decode
+        self.valid_img_exts = SupportedFileTypes.IMAGE
+
+    async def run(self, items):
+        try:
+            return await super().run(items)
+        finally:
+            # Batching threads are restarted by the next run
+            for encoder in self.encoders.values():
+                if isinstance(encoder, CoalescingEmbedder):
+                    encoder.stop()
+
+    def on_process(self, item):
+        if not are_valid_files(self.valid_img_exts, [item]):
+            raise SmartScanError("Unsupported file type", code=ErrorCode.UNSUPPORTED_FILE_TYPE, details=f"Supported file types: {SupportedFileTypes.IMAGE}")
+        return item, embed_image_file_multi(item, self.encoders, self.reduced_decode)
+
+    async def on_batch_complete(self, batch):
+        await self.listener.on_batch_complete(batch)
@@ -1,14 +1,40 @@
+import threading
+from collections import OrderedDict
+from typing import Callable
 from smartscan.models.base_model import BaseModel
 import onnxruntime as ort
 import numpy as np
 
 class OnnxModel(BaseModel):
-    def __init__(self, model_path: str):
+    # Process wide thread count, e.g. pinned per worker by ShardedProcessExecutor
+    default_intra_op_num_threads: int | None = None
+
+    def __init__(self, model_path: str, intra_op_num_threads: int | None = None, io_binding: bool = True, max_bound_shapes: int = 8, warmup_batch_sizes: tuple[int, ...] = (1,)):
         self.ort_session = None
         self.model_path = model_path
+        self.intra_op_num_threads = intra_op_num_threads
+        self.io_binding = io_binding
+        self.max_bound_shapes = max_bound_shapes
+        self.warmup_batch_sizes = warmup_batch_sizes
+        self.inputs = []
+        self.outputs = []
+        self.input_names: list[str] = []
+        self.output_names: list[str] = []
+        self._local = threading.local()
 
     def load(self):
-        self.ort_session =  ort.InferenceSession(self.model_path)
+        options = ort.SessionOptions()
+        num_threads = self.intra_op_num_threads or OnnxModel.default_intra_op_num_threads
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.ort_session =  ort.InferenceSession(self.model_path, sess_options=options)
+        # Metadata lookups go through pybind on every call, so read them once
+        self.inputs = self.ort_session.get_inputs()
+        self.outputs = self.ort_session.get_outputs()
+        self.input_names = [node.name for node in self.inputs]
+        self.output_names = [node.name for node in self.outputs]
+        self._local = threading.local()
 
 
     def is_load(self) -> bool:
@@ -16,9 +42,67 @@ class OnnxModel(BaseModel):
     
     def close(self):
         self.ort_session = None
+        self._local = threading.local()
 
     def get_inputs(self):
-        return self.ort_session.get_inputs()
+        return self.inputs
+
+    def get_outputs(self):
+        return self.outputs
+
+    def warmup(self, make_inputs: Callable[[int], dict]):
+        """Run representative inputs for each of `warmup_batch_sizes` so lazy kernel setup happens before real calls."""
+        for batch_size in self.warmup_batch_sizes:
+            self.run(make_inputs(batch_size))
+
+    def warmup_images(self, preprocess: Callable[[np.ndarray], np.ndarray], size: tuple[int, int]):
+        """`warmup` with a blank (w, h) RGB image through `preprocess` as the first input."""
+        w, h = size
+        self.warmup(lambda n: {self.input_names[0]: np.concatenate([preprocess(np.zeros((h, w, 3), dtype=np.uint8))] * n)})
+
+    def warmup_tokens(self, max_len: int, n_inputs: int = 1):
+        """`warmup` with zero int64 token batches of `max_len` for the first `n_inputs` inputs."""
+        self.warmup(lambda n: {name: np.zeros((n, max_len), dtype=np.int64) for name in self.input_names[:n_inputs]})
 
     def run(self, inputs: dict) -> list[np.ndarray]:
-        return self.ort_session.run(None, inputs)
\ No newline at end of file
+        """
+        Run the model. With `io_binding`, outputs are written into buffers kept per thread and
+        input shapes, so the returned arrays are reused by the next call with the same shapes
+        on the same thread; copy anything that must outlive that call.
+        """
+        if not self.io_binding:
+            return self.ort_session.run(None, inputs)
+
+        key = tuple((name, value.shape, value.dtype.str) for name, value in inputs.items())
+        bindings = getattr(self._local, "bindings", None)
+        if bindings is None:
+            bindings = self._local.bindings = OrderedDict()
+        entry = bindings.get(key)
+        if entry is None:
+            # The first call for a shape learns the output shapes, later calls reuse its buffers
+            outputs = self.ort_session.run(None, inputs)
+            bindings[key] = self._bind_outputs(outputs)
+            if len(bindings) > self.max_bound_shapes:
+                bindings.popitem(last=False)
+            return outputs
+        bindings.move_to_end(key)
+        if entry is False:
+            return self.ort_session.run(None, inputs)
+
+        binding, buffers = entry
+        for name, value in inputs.items():
+            binding.bind_cpu_input(name, np.ascontiguousarray(value))
+        try:
+            self.ort_session.run_with_iobinding(binding)
+        except Exception:
+            # Outputs whose shapes do not follow from the input shapes cannot be preallocated
+            bindings[key] = False
+            return self.ort_session.run(None, inputs)
+        return buffers
+
+    def _bind_outputs(self, outputs: list[np.ndarray]):
+        binding = self.ort_session.io_binding()
+        buffers = [np.empty_like(output) for output in outputs]
+        for name, buffer in zip(self.output_names, buffers):
+            binding.bind_output(name, "cpu", 0, buffer.dtype, buffer.shape, buffer.ctypes.data)
+        return binding, buffers
@@ -2,3 +2,9 @@ from smartscan.processor.memory import MemoryManager
 from smartscan.processor.processor_listener import ProcessorListener
 from smartscan.processor.processor import BatchProcessor
 from smartscan.processor.metrics import MetricsFailure, MetricsSuccess
+from smartscan.processor.journal import ProgressJournal
+from smartscan.processor.executor import ShardedProcessExecutor
+from smartscan.processor.progress import ProgressTracker, ProgressUpdate
+from smartscan.processor.sink import SinkQueue
+from smartscan.processor.scheduler import JobScheduler, Job
+from smartscan.processor.planner import CostPlanner, FileCostModel
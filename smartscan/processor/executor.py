@@ -0,0 +1,202 @@
+import os
+import pickle
+import asyncio
+import multiprocessing as mp
+from multiprocessing.connection import Connection, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable
+
+import psutil
+
+from smartscan.errors import SmartScanError, ErrorCode
+
+_DONE = "done"
+_RESULT = "result"
+_INIT_FAILED = "init_failed"
+
+
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+@contextmanager
+def _thread_env(threads_per_worker: int):
+    # Spawned children inherit the environment at start, before numpy creates its BLAS thread pool
+    previous = {var: os.environ.get(var) for var in _THREAD_ENV_VARS}
+    os.environ.update({var: str(threads_per_worker) for var in _THREAD_ENV_VARS})
+    try:
+        yield
+    finally:
+        for var, value in previous.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def _pin_worker(threads_per_worker: int, cpus: list[int] | None):
+    from smartscan.models.onnx_model import OnnxModel
+    OnnxModel.default_intra_op_num_threads = threads_per_worker
+
+    if cpus:
+        try:
+            psutil.Process().cpu_affinity(cpus)
+        except (AttributeError, psutil.Error, OSError):
+            pass
+
+
+def _picklable_error(e: Exception) -> Exception:
+    try:
+        pickle.dumps(e)
+        return e
+    except Exception:
+        return SmartScanError(str(e), details=type(e).__name__)
+
+
+def _worker_main(processor_factory: Callable, shard: list[tuple[int, Any]], conn: Connection, threads_per_worker: int, cpus: list[int] | None):
+    _pin_worker(threads_per_worker, cpus)
+    try:
+        processor = processor_factory()
+    except Exception as e:
+        conn.send((_INIT_FAILED, None, None, _picklable_error(e)))
+        return
+
+    # Pipe sends are synchronous, so every result sent survives a later crash of this worker
+    for index, item in shard:
+        try:
+            output = processor.on_process(item)
+            conn.send((_RESULT, index, output, None))
+        except Exception as e:
+            conn.send((_RESULT, index, None, _picklable_error(e)))
+    conn.send((_DONE, None, None, None))
+    conn.close()
+
+
+@dataclass
+class _Worker:
+    process: Any
+    conn: Connection
+    slot: int
+    pending: dict[int, Any] = field(default_factory=dict)
+    done: bool = False
+
+
+class ShardedProcessExecutor():
+    """
+    Runs a processor's `on_process` across several worker processes.
+
+    The input list is sharded over `n_workers` processes. Each worker builds its own
+    processor (and therefore its own provider sessions) by calling `processor_factory`,
+    which must be picklable (e.g. a module level function). Thread pools inside each
+    worker are pinned to `threads_per_worker`. If a worker dies, its unfinished items
+    are reassigned to a replacement worker; an item that repeatedly kills its worker
+    is reported as failed after `max_restarts` attempts.
+    """
+    def __init__(self,
+                 processor_factory: Callable[[], Any],
+                 n_workers: int | None = None,
+                 threads_per_worker: int = 1,
+                 ordered: bool = False,
+                 max_restarts: int = 2,
+                 pin_cpus: bool = False,
+                 start_method: str = "spawn",
+                 poll_interval: float = 0.1,
+                 ):
+        self.processor_factory = processor_factory
+        self.n_workers = n_workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+        self.threads_per_worker = threads_per_worker
+        self.ordered = ordered
+        self.max_restarts = max_restarts
+        self.pin_cpus = pin_cpus
+        self.poll_interval = poll_interval
+        self._ctx = mp.get_context(start_method)
+
+    async def stream(self, items: list) -> AsyncIterator[tuple[Any, Any, Exception | None]]:
+        """Yield `(item, output, error)` for every item, in input order if `ordered` else as completed."""
+        workers: dict[Connection, _Worker] = {}
+        crash_counts: dict[int, int] = {}
+        n_workers = min(self.n_workers, len(items))
+
+        def spawn(shard: list[tuple[int, Any]], slot: int):
+            parent_conn, child_conn = self._ctx.Pipe(duplex=False)
+            process = self._ctx.Process(
+                target=_worker_main,
+                args=(self.processor_factory, shard, child_conn, self.threads_per_worker, self._cpus_for(slot)),
+                daemon=True,
+            )
+            with _thread_env(self.threads_per_worker):
+                process.start()
+            # Closing our copy means the pipe reports EOF as soon as the worker exits
+            child_conn.close()
+            workers[parent_conn] = _Worker(process, parent_conn, slot, dict(shard))
+
+        # Strided shards keep every worker busy near the front of the list, which suits ordered delivery
+        for slot in range(n_workers):
+            spawn([(i, items[i]) for i in range(slot, len(items), n_workers)], slot)
+
+        def receive(worker: _Worker) -> list[tuple[int, Any, Exception | None]]:
+            try:
+                kind, index, output, error = worker.conn.recv()
+            except (EOFError, OSError):
+                return handle_exit(worker)
+            if kind == _INIT_FAILED:
+                raise SmartScanError("Worker initialisation failed", code=ErrorCode.WORKER_FAILED, details=error)
+            if kind == _DONE:
+                worker.done = True
+                return []
+            del worker.pending[index]
+            return [(index, output, error)]
+
+        def handle_exit(worker: _Worker) -> list[tuple[int, Any, Exception | None]]:
+            del workers[worker.conn]
+            worker.conn.close()
+            worker.process.join()
+            if worker.done or not worker.pending:
+                return []
+            shard = list(worker.pending.items())
+            # Workers process their shard in order, so the first unfinished item is the suspect
+            suspect_index, _ = shard[0]
+            crash_counts[suspect_index] = crash_counts.get(suspect_index, 0) + 1
+            crashed = []
+            if crash_counts[suspect_index] > self.max_restarts:
+                error = SmartScanError("Worker crashed while processing item", code=ErrorCode.WORKER_FAILED, details=f"exitcode={worker.process.exitcode}")
+                crashed.append((suspect_index, None, error))
+                shard = shard[1:]
+            if shard:
+                spawn(shard, worker.slot)
+            return crashed
+
+        buffered: dict[int, tuple[Any, Exception | None]] = {}
+        next_index = 0
+        remaining = len(items)
+        try:
+            while remaining > 0:
+                ready = await asyncio.to_thread(wait, list(workers), self.poll_interval)
+                completed = []
+                for conn in ready:
+                    completed.extend(receive(workers[conn]))
+
+                for index, output, error in completed:
+                    remaining -= 1
+                    if not self.ordered:
+                        yield items[index], output, error
+                        continue
+                    buffered[index] = (output, error)
+                    while next_index in buffered:
+                        output, error = buffered.pop(next_index)
+                        yield items[next_index], output, error
+                        next_index += 1
+        finally:
+            for worker in workers.values():
+                worker.conn.close()
+                if worker.process.is_alive():
+                    worker.process.terminate()
+            for worker in workers.values():
+                worker.process.join(timeout=1)
+
+    def _cpus_for(self, slot: int) -> list[int] | None:
+        if not self.pin_cpus:
+            return None
+        n_cpus = os.cpu_count() or 1
+        start = (slot * self.threads_per_worker) % n_cpus
+        return [(start + i) % n_cpus for i in range(self.threads_per_worker)]
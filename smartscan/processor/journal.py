@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+
+from smartscan.errors import SmartScanError
+
+
+class ProgressJournal():
+    """
+    Append-only journal of item outcomes for a processor job.
+
+    Each line records the status of one item (completed, failed or timed out). Items
+    that timed out are quarantined: reruns skip them unless asked to retry. Writes are
+    flushed and fsynced once per batch (or at most every `fsync_interval` seconds)
+    so the cost is amortised over the inference of a whole batch. When the file
+    holds more records than live entries (e.g. failures later retried) it is
+    compacted by rewriting the live state and atomically replacing the file.
+    """
+    COMPLETED = "C"
+    FAILED = "F"
+    TIMED_OUT = "T"
+
+    def __init__(self,
+                 job_id: str,
+                 journal_dir: str = ".smartscan_journals",
+                 fsync_interval: float = 0.0,
+                 compact_ratio: float = 1.5,
+                 min_compact_records: int = 1000,
+                 ):
+        self.job_id = job_id
+        self.path = Path(journal_dir) / f"{job_id}.journal"
+        self.fsync_interval = fsync_interval
+        self.compact_ratio = compact_ratio
+        self.min_compact_records = min_compact_records
+        self._entries: dict[str, str] = {}
+        self._n_records = 0
+        self._last_fsync = 0.0
+        self._file = None
+        # Batches may be recorded from several sink threads at once
+        self._lock = threading.Lock()
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._entries, self._n_records = self._load()
+        if self._needs_compaction() or self._has_torn_tail():
+            self.compact()
+        self._file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def close(self):
+        if self._file is None:
+            return
+        self._sync(force=True)
+        self._file.close()
+        self._file = None
+        if self._needs_compaction():
+            self.compact()
+
+    def is_open(self) -> bool:
+        return self._file is not None
+
+    def is_completed(self, key: str) -> bool:
+        return self._entries.get(key) == self.COMPLETED
+
+    def is_failed(self, key: str) -> bool:
+        return self._entries.get(key) == self.FAILED
+
+    def is_timed_out(self, key: str) -> bool:
+        return self._entries.get(key) == self.TIMED_OUT
+
+    def should_process(self, key: str, retry_failed: bool = False, retry_timed_out: bool = False) -> bool:
+        status = self._entries.get(key)
+        if status is None:
+            return True
+        if status == self.FAILED:
+            return retry_failed
+        if status == self.TIMED_OUT:
+            return retry_timed_out
+        return False
+
+    @property
+    def completed_count(self) -> int:
+        return sum(1 for status in self._entries.values() if status == self.COMPLETED)
+
+    @property
+    def failed_count(self) -> int:
+        return sum(1 for status in self._entries.values() if status == self.FAILED)
+
+    @property
+    def quarantined(self) -> list[str]:
+        """Keys of items that timed out."""
+        return [key for key, status in self._entries.items() if status == self.TIMED_OUT]
+
+    def record_batch(self, completed: list[str], failed: list[str], timed_out: list[str] = ()):
+        """Append outcomes for one batch and make them durable."""
+        with self._lock:
+            self._record_batch(completed, failed, timed_out)
+
+    def _record_batch(self, completed: list[str], failed: list[str], timed_out: list[str]):
+        if self._file is None:
+            raise SmartScanError("Journal not open", details="Call open method first")
+        lines = [self._encode(self.COMPLETED, key) for key in completed]
+        lines.extend(self._encode(self.FAILED, key) for key in failed)
+        lines.extend(self._encode(self.TIMED_OUT, key) for key in timed_out)
+        if not lines:
+            return
+        self._file.write("".join(lines))
+        for key in completed:
+            self._entries[key] = self.COMPLETED
+        for key in failed:
+            self._entries[key] = self.FAILED
+        for key in timed_out:
+            self._entries[key] = self.TIMED_OUT
+        self._n_records += len(lines)
+        self._sync()
+
+        if self._needs_compaction():
+            self._file.close()
+            self.compact()
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def compact(self):
+        """Rewrite the journal so it contains exactly one record per item."""
+        tmp_path = self.path.with_suffix(".journal.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("".join(self._encode(status, key) for key, status in self._entries.items()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._n_records = len(self._entries)
+
+    def clear(self):
+        """Forget all progress for this job."""
+        was_open = self.is_open()
+        if was_open:
+            self._file.close()
+            self._file = None
+        self._entries = {}
+        self._n_records = 0
+        if self.path.exists():
+            self.path.unlink()
+        if was_open:
+            self.open()
+
+    def _sync(self, force: bool = False):
+        self._file.flush()
+        now = time.monotonic()
+        if force or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def _needs_compaction(self) -> bool:
+        return self._n_records >= self.min_compact_records and self._n_records > self.compact_ratio * len(self._entries)
+
+    def _has_torn_tail(self) -> bool:
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return False
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def _load(self) -> tuple[dict[str, str], int]:
+        entries: dict[str, str] = {}
+        n_records = 0
+        if not self.path.exists():
+            return entries, n_records
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                # A torn final line from a crash mid-write is simply ignored
+                if len(line) < 3 or not line.endswith("\n"):
+                    continue
+                try:
+                    key = json.loads(line[2:])
+                except json.JSONDecodeError:
+                    continue
+                entries[key] = line[0]
+                n_records += 1
+        return entries, n_records
+
+    @staticmethod
+    def _encode(status: str, key: str) -> str:
+        return f"{status}\t{json.dumps(key)}\n"
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
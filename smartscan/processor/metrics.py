@@ -4,6 +4,9 @@ from dataclasses import dataclass
 class MetricsSuccess:
     total_processed: int = 0
     time_elapsed: float = 0.0
+    # Worker time spent in `on_process`, split into time blocked on file data and the rest
+    io_wait: float = 0.0
+    compute_time: float = 0.0
 
 @dataclass
 class MetricsFailure:
@@ -0,0 +1,121 @@
+import os
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Generic, Literal
+from PIL import Image
+
+from smartscan.utils import get_file_type, probe_video
+from smartscan.types import Input
+
+PlanOrder = Literal["given", "largest_first", "interleave"]
+
+
+class CostPlanner(Generic[Input]):
+    """
+    Orders items by estimated cost and groups them into batches by a cost budget instead
+    of a fixed item count, so one expensive item no longer holds back a batch of cheap ones.
+
+    `largest_first` starts the most expensive work early so the job does not end on a long
+    tail; `interleave` alternates heavy and light items so batches have a similar mix.
+    Items of a batch run concurrently on `workers`, so without `batch_cost` the budget is
+    enough work to keep every worker busy for as long as the most expensive item takes
+    (and at least the mean cost of a `batch_size` item batch): light items fill the other
+    workers instead of a heavy item running alone. Batches never exceed `max_batch_size`
+    items (4x the processor's `batch_size` when not set). Costs are estimated on up to
+    `io_threads` threads, as estimates may touch the file system.
+    """
+    def __init__(self, cost_fn: Callable[[Input], float], order: PlanOrder = "largest_first", batch_cost: float | None = None, max_batch_size: int | None = None, default_cost: float = 1.0, io_threads: int = 8):
+        self.cost_fn = cost_fn
+        self.order = order
+        self.batch_cost = batch_cost
+        self.max_batch_size = max_batch_size
+        self.default_cost = default_cost
+        self.io_threads = io_threads
+
+    def estimate(self, item: Input) -> float:
+        try:
+            return max(0.0, float(self.cost_fn(item)))
+        except Exception:
+            # Planning is best effort; the item fails properly when processed
+            return self.default_cost
+
+    def plan(self, items: list[Input], batch_size: int, workers: int = 1) -> list[list[Input]]:
+        if not items:
+            return []
+        if self.io_threads > 1 and len(items) > 1:
+            with ThreadPoolExecutor(min(self.io_threads, len(items)), thread_name_prefix="smartscan-planner") as pool:
+                costs = list(pool.map(self.estimate, items, chunksize=64))
+        else:
+            costs = [self.estimate(item) for item in items]
+        order = self._order(costs)
+        max_items = self.max_batch_size or 4 * batch_size
+        budget = self.batch_cost or max(max(costs) * workers, sum(costs) / math.ceil(len(items) / batch_size))
+
+        batches: list[list[Input]] = []
+        batch: list[Input] = []
+        batch_cost = 0.0
+        for index in order:
+            if batch and (batch_cost + costs[index] > budget or len(batch) >= max_items):
+                batches.append(batch)
+                batch, batch_cost = [], 0.0
+            batch.append(items[index])
+            batch_cost += costs[index]
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _order(self, costs: list[float]) -> list[int]:
+        if self.order == "given":
+            return list(range(len(costs)))
+        descending = sorted(range(len(costs)), key=lambda i: costs[i], reverse=True)
+        if self.order == "largest_first":
+            return descending
+        # Heaviest, lightest, second heaviest, second lightest, ...
+        interleaved = []
+        low, high = 0, len(descending) - 1
+        while low <= high:
+            interleaved.append(descending[low])
+            if low != high:
+                interleaved.append(descending[high])
+            low, high = low + 1, high - 1
+        return interleaved
+
+
+@dataclass
+class FileCostModel:
+    """
+    Estimates the relative processing cost of a file from one `os.stat` by default: its
+    type and size. `probe_images` reads image headers for the pixel count and
+    `probe_videos` runs ffprobe for the duration, at the price of opening every file.
+    Units are arbitrary; only ratios between files matter.
+    """
+    image_base: float = 1.0
+    image_per_megapixel: float = 0.1
+    image_per_mb: float = 0.4
+    text_base: float = 0.5
+    text_per_mb: float = 1.0
+    text_max: float = 5.0
+    video_base: float = 5.0
+    video_per_minute: float = 1.0
+    video_per_mb: float = 0.05
+    probe_images: bool = False
+    probe_videos: bool = False
+
+    def __call__(self, path: str) -> float:
+        file_type = get_file_type(path)
+        if file_type == "image":
+            if not self.probe_images:
+                return self.image_base + self.image_per_mb * os.path.getsize(path) / 1e6
+            with Image.open(path) as image:
+                width, height = image.size
+            return self.image_base + self.image_per_megapixel * width * height / 1e6
+        if file_type == "text":
+            # Sampled chunking bounds the work for large files
+            return min(self.text_max, self.text_base + self.text_per_mb * os.path.getsize(path) / 1e6)
+        if file_type == "video":
+            if self.probe_videos:
+                _, _, duration = probe_video(path)
+                return self.video_base + self.video_per_minute * duration / 60
+            return self.video_base + self.video_per_mb * os.path.getsize(path) / 1e6
+        return self.image_base
@@ -1,13 +1,26 @@
 import time
 import asyncio
+import functools
+import threading
+import contextvars
 from asyncio import Semaphore
 from abc import ABC, abstractmethod
-from typing import Generic
+from concurrent.futures import Executor
+from contextlib import AbstractAsyncContextManager, nullcontext
+from typing import Callable, Generic
 
 from smartscan.processor.processor_listener import ProcessorListener
 from smartscan.processor.memory import MemoryManager
-from smartscan.utils.async_utils import AtomicInteger
+from smartscan.processor.journal import ProgressJournal
+from smartscan.processor.executor import ShardedProcessExecutor
+from smartscan.processor.progress import ProgressTracker
+from smartscan.processor.sink import SinkQueue
+from smartscan.processor.planner import CostPlanner
 from smartscan.processor.metrics import  MetricsFailure, MetricsSuccess
+from smartscan.utils.cancellation import CancellationToken, set_current_token
+from smartscan.utils.prefetch import FilePrefetcher, set_current_prefetcher
+from smartscan.utils.file_utils import get_file_type
+from smartscan.errors import SmartScanError, ErrorCode
 from smartscan.types import Input, Output
 
 
@@ -19,9 +32,41 @@ class BatchProcessor(ABC, Generic[Input, Output]):
                  high_memory_threshold: int = 1600,
                  min_concurrency: int = 1,
                  max_concurrency: int = 8,
+                 journal: None | ProgressJournal = None,
+                 retry_failed: bool = False,
+                 executor: None | ShardedProcessExecutor = None,
+                 progress_interval: float = 0.1,
+                 progress_step: float = 0.01,
+                 max_pending_sinks: int = 0,
+                 ordered_sinks: bool = True,
+                 item_timeout: float | None = None,
+                 timeouts: dict[str, float] | None = None,
+                 retry_timed_out: bool = False,
+                 planner: None | CostPlanner[Input] = None,
+                 prefetcher: None | FilePrefetcher = None,
                  ):
         self.batch_size = batch_size
         self.listener = listener
+        self.journal = journal
+        self.retry_failed = retry_failed
+        self.executor = executor
+        self.progress_interval = progress_interval
+        self.progress_step = progress_step
+        self.max_pending_sinks = max_pending_sinks
+        self.ordered_sinks = ordered_sinks
+        self.item_timeout = item_timeout
+        # Per file type ("image", "text", "video") time budgets in seconds for path items, overriding item_timeout
+        self.timeouts = timeouts or {}
+        self.retry_timed_out = retry_timed_out
+        # Optional cost based ordering and batching; batches are a fixed item count otherwise
+        self.planner = planner
+        # Optional read-ahead of input files in processing order; not used with an executor
+        self.prefetcher = prefetcher
+        self._worker_time = 0.0
+        self._worker_time_lock = threading.Lock()
+        # Set by JobScheduler to share its worker pool and take turns with other jobs per batch
+        self.worker_pool: None | Executor = None
+        self.batch_gate: None | Callable[[], AbstractAsyncContextManager] = None
         self.memory_manager = MemoryManager(
             low_memory_threshold=low_memory_threshold,
             high_memory_threshold=high_memory_threshold, 
@@ -31,10 +76,19 @@ class BatchProcessor(ABC, Generic[Input, Output]):
 
     async def run(self, items: list[Input]):
         start = time.perf_counter()
-        processed_count = AtomicInteger(0)
         success_count = 0
+        self._worker_time = 0.0
+        io_wait_start = self.prefetcher.stats.io_wait if self.prefetcher is not None else 0.0
+        # Batch completion handlers overlap with processing of later batches when enabled
+        sinks = SinkQueue(self.max_pending_sinks, self.ordered_sinks) if self.max_pending_sinks > 0 else None
 
         try:
+            if self.journal is not None:
+                if not self.journal.is_open():
+                    await asyncio.to_thread(self.journal.open)
+                # Items finished by a previous run of the same job are skipped
+                items = [item for item in items if self.journal.should_process(self.journal_key(item), self.retry_failed, self.retry_timed_out)]
+
             if(len(items) <= 0):
                 print(f"No items to process")
                 result = MetricsSuccess()
@@ -44,38 +98,104 @@ class BatchProcessor(ABC, Generic[Input, Output]):
             
             if self.listener is not None:
                 await self.listener.on_active()
+
+            if self.planner is not None:
+                # Cost estimates may read file headers, so plan off the event loop
+                batches = await asyncio.to_thread(self.planner.plan, items, self.batch_size, self.memory_manager.calculate_concurrency())
+                items = [item for batch in batches for item in batch]
+            else:
+                batches = [items[start:start + self.batch_size] for start in range(0, len(items), self.batch_size)]
             
-            batch_start = 0
+            tracker = ProgressTracker(len(items), self.progress_interval, self.progress_step)
+            pending_errors: list[tuple[Exception, Input]] = []
+
+            async def flush_errors():
+                if self.listener is not None and pending_errors:
+                    errors = pending_errors.copy()
+                    pending_errors.clear()
+                    await self.listener.on_errors(errors)
+
+            async def report(item: Input, error: Exception | None):
+                if error is not None:
+                    self.on_item_error(item, error)
+                # Without a listener nobody reads the errors, and their tracebacks can hold large frames
+                if error is not None and self.listener is not None:
+                    pending_errors.append((error, item))
+                update = tracker.advance()
+                if update is not None and self.listener is not None:
+                    await flush_errors()
+                    await self.listener.on_progress_update(update)
+
+            async def complete_batch(batch: list[Input], batch_outputs: list[Output | None], failed: list[Input], timed_out: list[Input]):
+                nonlocal success_count
+                filtered_batch_ouptputs = [out for out in batch_outputs if out is not None]
+                success_count += len(filtered_batch_ouptputs)
+                await flush_errors()
+
+                async def sink():
+                    await self.on_batch_complete(filtered_batch_ouptputs)
+                    # Only journal a batch once its sink has accepted the results
+                    if self.journal is not None:
+                        await self._record_batch(batch, batch_outputs, failed, timed_out)
 
-            async def async_task(item: Input, semaphore: Semaphore):
+                if sinks is None:
+                    await sink()
+                else:
+                    await sinks.submit(sink)
+
+            async def async_task(item: Input, semaphore: Semaphore, failed: list[Input], timed_out: list[Input]):
                 async with semaphore:
+                    error = None
                     try:
-                        return await asyncio.to_thread(self.on_process, item)
+                        return await self._run_in_worker(item)
                     except Exception as e:
-                        if self.listener is not None:
-                            await self.listener.on_error(e, item)
+                        (timed_out if _is_timeout(e) else failed).append(item)
+                        error = e
                         return None
                     finally:
-                        if self.listener is not None:
-                            current = await processed_count.increment_and_get()
-                            progress = current / len(items)
-                            await self.listener.on_progress(progress)
-
-            while batch_start < len(items):
-                concurrency = self.memory_manager.calculate_concurrency()
-                semaphore = Semaphore(concurrency)
-                batch_end = batch_start + self.batch_size
-                batch = items[batch_start : batch_end]
-                tasks = [async_task(item, semaphore) for item in batch]
-                batch_outputs = await asyncio.gather(*tasks)
-                filtered_batch_ouptputs = [out for out in batch_outputs if out is not None]
-                success_count += len(filtered_batch_ouptputs)
-                await self.on_batch_complete(filtered_batch_ouptputs)
-                
-                batch_start += self.batch_size
+                        if self.prefetcher is not None:
+                            # Frees the budget held by files the item did not read
+                            path = self.prefetch_path(item)
+                            if path is not None:
+                                self.prefetcher.discard(path)
+                        await report(item, error)
+
+            if self.executor is not None:
+                # Items are processed out of process; results are regrouped into batches as they stream back
+                batch, batch_outputs, failed, timed_out = [], [], [], []
+                stream = self.executor.stream(items)
+                try:
+                    async for item, output, error in stream:
+                        batch.append(item)
+                        batch_outputs.append(output)
+                        if error is not None:
+                            (timed_out if _is_timeout(error) else failed).append(item)
+                        await report(item, error)
+                        if len(batch) >= self.batch_size:
+                            await complete_batch(batch, batch_outputs, failed, timed_out)
+                            batch, batch_outputs, failed, timed_out = [], [], [], []
+                finally:
+                    await stream.aclose()
+                if batch:
+                    await complete_batch(batch, batch_outputs, failed, timed_out)
+            else:
+                if self.prefetcher is not None:
+                    self.prefetcher.prefetch((path for path in map(self.prefetch_path, items) if path is not None), self.prefetch_hint_only)
+                for batch in batches:
+                    concurrency = self.memory_manager.calculate_concurrency()
+                    semaphore = Semaphore(concurrency)
+                    failed, timed_out = [], []
+                    async with self._batch_slot():
+                        tasks = [async_task(item, semaphore, failed, timed_out) for item in batch]
+                        batch_outputs = await asyncio.gather(*tasks)
+                    await complete_batch(batch, batch_outputs, failed, timed_out)
+
+            if sinks is not None:
+                await sinks.drain()
             
             end = time.perf_counter()
-            result = MetricsSuccess(total_processed=success_count, time_elapsed=end - start)
+            io_wait = self.prefetcher.stats.io_wait - io_wait_start if self.prefetcher is not None else 0.0
+            result = MetricsSuccess(total_processed=success_count, time_elapsed=end - start, io_wait=io_wait, compute_time=max(0.0, self._worker_time - io_wait))
             if self.listener is not None:
                 await self.listener.on_complete(result)
             return result
@@ -85,6 +205,89 @@ class BatchProcessor(ABC, Generic[Input, Output]):
             if self.listener is not None:
                 await self.listener.on_fail(result)
             return result
+        finally:
+            if sinks is not None:
+                await sinks.cancel()
+            if self.prefetcher is not None:
+                self.prefetcher.clear()
+            if self.journal is not None:
+                await asyncio.to_thread(self.journal.close)
+
+    async def _run_in_worker(self, item: Input) -> Output:
+        # Same as asyncio.to_thread (on the shared pool when set), keeping the caller's context
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        if self.prefetcher is not None:
+            context.run(set_current_prefetcher, self.prefetcher)
+        timeout = self.timeout_for(item)
+        if timeout is None:
+            return await loop.run_in_executor(self.worker_pool, functools.partial(context.run, self._timed_process, item))
+
+        # The budget starts when the item starts running, not while it waits for a worker
+        # (e.g. behind other jobs' work on a shared pool)
+        token = CancellationToken()
+        context.run(set_current_token, token)
+        started = loop.create_future()
+
+        def run_item():
+            token.start(timeout)
+            loop.call_soon_threadsafe(_set_started, started)
+            return self._timed_process(item)
+
+        future = loop.run_in_executor(self.worker_pool, functools.partial(context.run, run_item))
+        try:
+            await asyncio.wait([future, started], return_when=asyncio.FIRST_COMPLETED)
+            if not future.done():
+                await asyncio.wait_for(future, token.remaining())
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # A TimeoutError raised by the item itself, not the budget running out
+                raise
+            # Kills child processes of the item; a thread stuck in native code is abandoned
+            # and finishes in the background, but its batch no longer waits for it
+            token.cancel()
+            raise SmartScanError("Item timed out", code=ErrorCode.TIMEOUT, details=f"Exceeded {timeout}s")
+        return future.result()
+
+    def _timed_process(self, item: Input) -> Output:
+        start = time.perf_counter()
+        try:
+            return self.on_process(item)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._worker_time_lock:
+                self._worker_time += elapsed
+
+    def prefetch_path(self, item: Input) -> str | None:
+        """File to read ahead for `item` when a prefetcher is set; items that are paths by default."""
+        return item if isinstance(item, str) else None
+
+    def prefetch_hint_only(self, path: str) -> bool:
+        """Whether `path` is only hinted to the kernel rather than read into memory; videos by default, as ffmpeg reads them by path."""
+        return get_file_type(path) == "video"
+
+    def timeout_for(self, item: Input) -> float | None:
+        """Time budget in seconds for processing `item`, or None for no limit."""
+        if self.timeouts and isinstance(item, str):
+            return self.timeouts.get(get_file_type(item), self.item_timeout)
+        return self.item_timeout
+
+    def on_item_error(self, item: Input, error: Exception):
+        """Called on the event loop for each failed item, including items processed by an executor."""
+        pass
+
+    def _batch_slot(self) -> AbstractAsyncContextManager:
+        return self.batch_gate() if self.batch_gate is not None else nullcontext()
+
+    def journal_key(self, item: Input) -> str:
+        """Stable identifier used to track an item across runs of the same job."""
+        return str(item)
+
+    async def _record_batch(self, batch: list[Input], batch_outputs: list[Output | None], failed: list[Input], timed_out: list[Input]):
+        failed_keys = [self.journal_key(item) for item in failed]
+        timed_out_keys = [self.journal_key(item) for item in timed_out]
+        completed_keys = [self.journal_key(item) for item, out in zip(batch, batch_outputs) if out is not None]
+        await asyncio.to_thread(self.journal.record_batch, completed_keys, failed_keys, timed_out_keys)
         
     # Doesnt need to be async becasue its wrapped in asyncio.to_thread
     @abstractmethod
@@ -95,3 +298,11 @@ class BatchProcessor(ABC, Generic[Input, Output]):
     async def on_batch_complete(self, batch: list[Output]):
         pass 
 
+
+def _set_started(started: asyncio.Future):
+    if not started.done():
+        started.set_result(None)
+
+
+def _is_timeout(error: Exception) -> bool:
+    return isinstance(error, SmartScanError) and error.code == ErrorCode.TIMEOUT
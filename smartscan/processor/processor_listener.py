@@ -1,20 +1,27 @@
 from abc import ABC
 from typing import Generic
 from smartscan.processor.metrics import MetricsFailure, MetricsSuccess
+from smartscan.processor.progress import ProgressUpdate
 from smartscan.types import Input, Output
 
 
 class ProcessorListener(ABC, Generic[Input, Output]):
     async def on_active(self):
         pass
-    # made async with asyncio.to_thread
-    def on_progress(self, progress: float):
+    async def on_progress(self, progress: float):
         pass
+    # Coalesced progress event with throughput and ETA, forwards to on_progress by default
+    async def on_progress_update(self, update: ProgressUpdate):
+        await self.on_progress(update.progress)
     async def on_complete(self, result: MetricsSuccess):
         pass
     async def on_batch_complete(self, batch: list[Output]):
         pass
     async def on_error(self, e: Exception, item: Input):
         pass
+    # Errors are reported in batches, forwards to on_error by default
+    async def on_errors(self, errors: list[tuple[Exception, Input]]):
+        for e, item in errors:
+            await self.on_error(e, item)
     async def on_fail(self, result: MetricsFailure):
         pass
\ No newline at end of file
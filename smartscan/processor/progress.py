@@ -0,0 +1,47 @@
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class ProgressUpdate:
+    progress: float
+    processed: int
+    total: int
+    elapsed: float
+    items_per_second: float
+    eta_seconds: float | None
+
+
+class ProgressTracker():
+    """
+    Counts processed items and decides when a progress event is worth emitting.
+
+    Only touched from the event loop, so a plain counter is enough. An update is emitted
+    when at least `min_interval` seconds have passed and progress moved by at least
+    `min_step` since the last one, and always for the final item.
+    """
+    def __init__(self, total: int, min_interval: float = 0.1, min_step: float = 0.01):
+        self.total = total
+        self.min_interval = min_interval
+        self.min_step = min_step
+        self.processed = 0
+        self._start = time.perf_counter()
+        self._last_time = float("-inf")
+        self._last_progress = 0.0
+
+    def advance(self, n: int = 1) -> ProgressUpdate | None:
+        self.processed += n
+        now = time.perf_counter()
+        progress = self.processed / self.total if self.total else 1.0
+        is_final = self.processed >= self.total
+        if not is_final and (now - self._last_time < self.min_interval or progress - self._last_progress < self.min_step):
+            return None
+        self._last_time = now
+        self._last_progress = progress
+        return self._update(now, progress)
+
+    def _update(self, now: float, progress: float) -> ProgressUpdate:
+        elapsed = now - self._start
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.processed) / rate if rate > 0 else None
+        return ProgressUpdate(progress, self.processed, self.total, elapsed, rate, eta)
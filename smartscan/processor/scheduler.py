@@ -0,0 +1,182 @@
+import os
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal
+
+from smartscan.processor.processor import BatchProcessor
+from smartscan.processor.metrics import MetricsFailure, MetricsSuccess
+from smartscan.errors import SmartScanError, ErrorCode
+
+JobPriority = Literal["interactive", "background"]
+
+
+class Job():
+    """Handle to a processor job submitted to a `JobScheduler`."""
+    def __init__(self, job_id: str, processor: BatchProcessor, items: list, priority: JobPriority, share: float, scheduler: "JobScheduler"):
+        self.job_id = job_id
+        self.processor = processor
+        self.items = items
+        self.priority = priority
+        self.share = share
+        self.paused = False
+        self.cancelled = False
+        self.task: asyncio.Task | None = None
+        self._scheduler = scheduler
+        self._running_batches = 0
+        # Stride scheduling position, advanced by 1/share for every batch granted
+        self._pass = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.task is not None and self.task.done()
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+        self._scheduler._dispatch()
+
+    def cancel(self):
+        """Stop the job at its next batch boundary; it completes with a `MetricsFailure`."""
+        self.cancelled = True
+        self._scheduler._dispatch()
+
+    async def wait(self) -> MetricsSuccess | MetricsFailure:
+        return await self.task
+
+
+class JobScheduler():
+    """
+    Runs several processor jobs at once on a shared worker pool.
+
+    Jobs take turns at batch granularity: at most `max_concurrent_batches` batches run at
+    a time, interactive jobs are always served before background ones, and within a
+    priority class slots are handed out by stride scheduling so each job receives batches
+    in proportion to its `share`. One slot is kept free of background work so interactive
+    batches start without waiting for a background batch to finish. Jobs built around the
+    same provider instances share their model sessions, and every job's `on_process` runs
+    on the scheduler's pool, bounding total inference threads to `max_workers`.
+    """
+    def __init__(self, max_workers: int | None = None, max_concurrent_batches: int = 2, reserved_interactive_slots: int = 1, fairness_grace: float = 0.005):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_concurrent_batches = max_concurrent_batches
+        self.reserved_interactive_slots = min(reserved_interactive_slots, max_concurrent_batches - 1)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="smartscan-job")
+        self.jobs: dict[str, Job] = {}
+        self._running: dict[JobPriority, int] = {"interactive": 0, "background": 0}
+        self._waiting: list[tuple[Job, asyncio.Future]] = []
+        self._ids = itertools.count()
+        # How long a slot may stay free for a job that is owed a turn but is between batches
+        self.fairness_grace = fairness_grace
+        self._grace_timer: asyncio.TimerHandle | None = None
+
+    def submit(self, processor: BatchProcessor, items: list, priority: JobPriority = "background", share: float = 1.0, job_id: str | None = None) -> Job:
+        job_id = job_id or f"job-{next(self._ids)}"
+        if job_id in self.jobs and not self.jobs[job_id].done:
+            raise SmartScanError("Job already running", code=ErrorCode.INVALID_ARGUMENT, details=job_id)
+        job = Job(job_id, processor, items, priority, share, self)
+        # New jobs join at the current minimum pass so they neither starve nor are starved
+        passes = [other._pass for other in self.jobs.values() if other.priority == priority and not other.done]
+        job._pass = min(passes, default=0.0)
+
+        processor.worker_pool = self.pool
+        processor.batch_gate = lambda: self._batch_slot(job)
+        self.jobs[job_id] = job
+        job.task = asyncio.create_task(processor.run(items))
+        job.task.add_done_callback(lambda _: self._dispatch())
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def shutdown(self):
+        for job in self.jobs.values():
+            job.cancel()
+        self.pool.shutdown(wait=False)
+
+    @asynccontextmanager
+    async def _batch_slot(self, job: Job):
+        await self._acquire(job)
+        try:
+            yield
+        finally:
+            self._running[job.priority] -= 1
+            job._running_batches -= 1
+            self._dispatch()
+
+    async def _acquire(self, job: Job):
+        if job.cancelled:
+            raise SmartScanError("Job cancelled", code=ErrorCode.JOB_CANCELLED, details=job.job_id)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append((job, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._waiting = [(j, f) for j, f in self._waiting if f is not future]
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self._running[job.priority] -= 1
+                job._running_batches -= 1
+            raise
+
+    def _dispatch(self, force: bool = False):
+        while self._waiting:
+            # Cancelled jobs are released immediately so they can finish
+            for job, future in [(j, f) for j, f in self._waiting if j.cancelled]:
+                self._waiting.remove((job, future))
+                if not future.done():
+                    future.set_exception(SmartScanError("Job cancelled", code=ErrorCode.JOB_CANCELLED, details=job.job_id))
+
+            entry = self._next_waiting(force)
+            if entry is None:
+                return
+            job, future = entry
+            self._waiting.remove(entry)
+            if future.done():
+                continue
+            self._running[job.priority] += 1
+            job._running_batches += 1
+            job._pass += 1.0 / max(job.share, 1e-6)
+            future.set_result(None)
+
+    def _next_waiting(self, force: bool = False) -> tuple[Job, asyncio.Future] | None:
+        running = self._running["interactive"] + self._running["background"]
+        free = self.max_concurrent_batches - running
+        if free <= 0:
+            return None
+        candidates = [(job, future) for job, future in self._waiting if not job.paused]
+        interactive = [entry for entry in candidates if entry[0].priority == "interactive"]
+        if interactive:
+            return self._fair_pick(interactive, force)
+        # Background work never takes the slots reserved for interactive batches
+        if free <= self.reserved_interactive_slots:
+            return None
+        background = [entry for entry in candidates if entry[0].priority == "background"]
+        if background:
+            return self._fair_pick(background, force)
+        return None
+
+    def _fair_pick(self, entries: list[tuple[Job, asyncio.Future]], force: bool) -> tuple[Job, asyncio.Future] | None:
+        best = min(entries, key=lambda entry: entry[0]._pass)
+        if force or self.fairness_grace <= 0:
+            return best
+        # A job with a lower pass that is between batches (e.g. in its sink) is owed this slot,
+        # so hold it briefly rather than letting jobs that ask more often take every turn
+        waiting = {id(job) for job, _ in self._waiting}
+        owed = any(
+            job.priority == best[0].priority and not job.done and not job.paused and not job.cancelled
+            and job._running_batches == 0 and id(job) not in waiting and job._pass < best[0]._pass
+            for job in self.jobs.values()
+        )
+        if not owed:
+            return best
+        if self._grace_timer is None:
+            self._grace_timer = asyncio.get_running_loop().call_later(self.fairness_grace, self._end_grace)
+        return None
+
+    def _end_grace(self):
+        self._grace_timer = None
+        self._dispatch(force=True)
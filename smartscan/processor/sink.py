@@ -0,0 +1,62 @@
+import asyncio
+from typing import Awaitable, Callable
+
+
+class SinkQueue():
+    """
+    Runs batch completion handlers in the background so processing of the next batches
+    can continue while results are written out.
+
+    At most `max_pending` handlers are in flight; `submit` waits for a free slot, which
+    applies backpressure to processing when the sink is slower than inference. With
+    `ordered` handlers run one after another in submission order, otherwise they run
+    concurrently. The first handler error is raised from the next `submit` or `drain`.
+    """
+    def __init__(self, max_pending: int = 2, ordered: bool = True):
+        self.max_pending = max(1, max_pending)
+        self.ordered = ordered
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._tasks: set[asyncio.Task] = set()
+        self._last: asyncio.Task | None = None
+        self._error: BaseException | None = None
+
+    async def submit(self, handler: Callable[[], Awaitable[None]]):
+        self._raise_if_failed()
+        await self._slots.acquire()
+        self._raise_if_failed()
+        task = asyncio.create_task(self._run(handler, self._last if self.ordered else None))
+        self._last = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self):
+        """Wait for every submitted handler and raise the first error, if any."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        self._raise_if_failed()
+
+    async def cancel(self):
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, handler: Callable[[], Awaitable[None]], previous: asyncio.Task | None):
+        try:
+            if previous is not None:
+                # Only the ordering matters here, the previous handler records its own error
+                await asyncio.wait({previous})
+            if self._error is None:
+                await handler()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+        finally:
+            self._slots.release()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise self._error
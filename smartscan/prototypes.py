@@ -0,0 +1,166 @@
+import numpy as np
+
+from smartscan.embeddings import embed_image_files, embed_text_files, embed_video_file
+from smartscan.providers import ImageEmbeddingProvider, TextEmbeddingProvider
+from smartscan.utils import are_valid_files
+from smartscan.errors import SmartScanError, ErrorCode
+from smartscan.constants import SupportedFileTypes
+
+
+class PrototypeStore():
+    """
+    Class prototypes maintained incrementally from example embeddings.
+
+    Each class keeps the running sum and count of its example embeddings, so adding or
+    removing examples only costs work for those examples. Example embeddings are kept so
+    they can be subtracted again on removal. Prototypes are the normalised class means,
+    identical to `generate_prototype_embedding` over the same examples, and are only
+    recomputed for classes that changed.
+    """
+    def __init__(self, embedding_dim: int):
+        self.embedding_dim = embedding_dim
+        self._examples: dict[str, dict[str, np.ndarray]] = {}
+        self._sums: dict[str, np.ndarray] = {}
+        self._prototypes: dict[str, np.ndarray] = {}
+
+    @property
+    def class_ids(self) -> list[str]:
+        return list(self._examples)
+
+    def __len__(self) -> int:
+        return len(self._examples)
+
+    def __contains__(self, class_id: str) -> bool:
+        return class_id in self._examples
+
+    def count(self, class_id: str) -> int:
+        return len(self._examples.get(class_id, {}))
+
+    def has_example(self, class_id: str, example_id: str) -> bool:
+        return example_id in self._examples.get(class_id, {})
+
+    def add_embeddings(self, class_id: str, example_ids: list[str], embeddings: np.ndarray):
+        """Add already computed example embeddings. Re-adding an example replaces its embedding."""
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.embedding_dim)
+        if len(example_ids) != len(embeddings):
+            raise SmartScanError("Number of example ids does not match number of embeddings", code=ErrorCode.INVALID_ARGUMENT, details=class_id)
+        examples = self._examples.setdefault(class_id, {})
+        sums = self._sums.setdefault(class_id, np.zeros(self.embedding_dim, dtype=np.float64))
+        for example_id, embedding in zip(example_ids, embeddings):
+            previous = examples.get(example_id)
+            if previous is not None:
+                sums -= previous
+            examples[example_id] = embedding
+            sums += embedding
+        self._prototypes.pop(class_id, None)
+
+    def add_files(self,
+                  examples: dict[str, list[str]],
+                  image_encoder: ImageEmbeddingProvider | None = None,
+                  text_encoder: TextEmbeddingProvider | None = None,
+                  n_frames: int = 10,
+                  n_chunks: int = 5,
+                  batch_size: int = 32,
+                  ) -> int:
+        """
+        Embed example files (class_id -> paths) that are not in the store yet and add them.
+        Files of the same type are embedded together in batches across classes.
+        Returns the number of newly embedded examples.
+        """
+        new = [(class_id, path) for class_id, paths in examples.items() for path in dict.fromkeys(paths) if not self.has_example(class_id, path)]
+        images = [(class_id, path) for class_id, path in new if are_valid_files(SupportedFileTypes.IMAGE, [path])]
+        texts = [(class_id, path) for class_id, path in new if are_valid_files(SupportedFileTypes.TEXT, [path])]
+        videos = [(class_id, path) for class_id, path in new if are_valid_files(SupportedFileTypes.VIDEO, [path])]
+        unsupported = [path for _, path in new if not are_valid_files(SupportedFileTypes.IMAGE + SupportedFileTypes.TEXT + SupportedFileTypes.VIDEO, [path])]
+        if unsupported:
+            raise SmartScanError("Unsupported file type", code=ErrorCode.UNSUPPORTED_FILE_TYPE, details=unsupported)
+        if (images or videos) and image_encoder is None:
+            raise SmartScanError("Image encoder required", code=ErrorCode.INVALID_ARGUMENT, details="Examples include image or video files")
+        if texts and text_encoder is None:
+            raise SmartScanError("Text encoder required", code=ErrorCode.INVALID_ARGUMENT, details="Examples include text files")
+
+        for start in range(0, len(images), batch_size):
+            batch = images[start:start + batch_size]
+            self._add_batch(batch, embed_image_files([path for _, path in batch], image_encoder))
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            self._add_batch(batch, embed_text_files([path for _, path in batch], text_encoder, 128, n_chunks, batch_size=batch_size))
+        for class_id, path in videos:
+            self.add_embeddings(class_id, [path], embed_video_file(path, n_frames, image_encoder))
+        return len(new)
+
+    def remove_examples(self, class_id: str, example_ids: list[str]):
+        examples = self._examples.get(class_id)
+        if examples is None:
+            return
+        sums = self._sums[class_id]
+        for example_id in example_ids:
+            embedding = examples.pop(example_id, None)
+            if embedding is not None:
+                sums -= embedding
+        if not examples:
+            self.remove_class(class_id)
+        else:
+            self._prototypes.pop(class_id, None)
+
+    def remove_class(self, class_id: str):
+        self._examples.pop(class_id, None)
+        self._sums.pop(class_id, None)
+        self._prototypes.pop(class_id, None)
+
+    def prototype(self, class_id: str) -> np.ndarray:
+        prototype = self._prototypes.get(class_id)
+        if prototype is None:
+            sums = self._sums.get(class_id)
+            if sums is None:
+                raise SmartScanError("Unknown class", code=ErrorCode.INVALID_ARGUMENT, details=class_id)
+            prototype = (sums / np.linalg.norm(sums)).astype(np.float32)
+            self._prototypes[class_id] = prototype
+        return prototype
+
+    def prototypes(self) -> list[tuple[str, np.ndarray]]:
+        """Prototypes in the form `FileClassifier` takes."""
+        return [(class_id, self.prototype(class_id)) for class_id in self._examples]
+
+    def matrix(self) -> tuple[list[str], np.ndarray]:
+        """Class ids and their prototypes as a (classes, dim) matrix."""
+        class_ids = self.class_ids
+        if not class_ids:
+            return [], np.empty((0, self.embedding_dim), dtype=np.float32)
+        return class_ids, np.stack([self.prototype(class_id) for class_id in class_ids])
+
+    def save(self, path: str):
+        class_ids = self.class_ids
+        owners = [i for i, class_id in enumerate(class_ids) for _ in self._examples[class_id]]
+        example_ids = [example_id for class_id in class_ids for example_id in self._examples[class_id]]
+        embeddings = [embedding for class_id in class_ids for embedding in self._examples[class_id].values()]
+        np.savez(
+            path,
+            embedding_dim=self.embedding_dim,
+            class_ids=np.array(class_ids, dtype=str),
+            example_ids=np.array(example_ids, dtype=str),
+            owners=np.array(owners, dtype=np.int64),
+            embeddings=np.stack(embeddings) if embeddings else np.empty((0, self.embedding_dim), dtype=np.float32),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "PrototypeStore":
+        with np.load(path) as f:
+            store = cls(int(f["embedding_dim"]))
+            class_ids = [str(class_id) for class_id in f["class_ids"]]
+            owners = f["owners"]
+            example_ids = f["example_ids"]
+            embeddings = f["embeddings"]
+        order = np.argsort(owners, kind="stable")
+        bounds = np.searchsorted(owners[order], np.arange(len(class_ids) + 1))
+        for i, class_id in enumerate(class_ids):
+            rows = order[bounds[i]:bounds[i + 1]]
+            store.add_embeddings(class_id, [str(example_id) for example_id in example_ids[rows]], embeddings[rows])
+        return store
+
+    def _add_batch(self, batch: list[tuple[str, str]], embeddings: np.ndarray):
+        by_class: dict[str, list[int]] = {}
+        for row, (class_id, _) in enumerate(batch):
+            by_class.setdefault(class_id, []).append(row)
+        for class_id, rows in by_class.items():
+            self.add_embeddings(class_id, [batch[row][1] for row in rows], embeddings[rows])
@@ -1,8 +1,9 @@
 from smartscan.providers.detectors.detector_provider import DetectorProvider
 from smartscan.providers.detectors.ultra_light.face import UltraLightFaceDetector
-from smartscan.providers.embeddings.embedding_provider import EmbeddingProvider, ImageEmbeddingProvider, TextEmbeddingProvider
+from smartscan.providers.embeddings.embedding_provider import EmbeddingProvider, WrappedEmbeddingProvider, ImageEmbeddingProvider, TextEmbeddingProvider
 from smartscan.providers.embeddings.clip.image import ClipImageEmbedder
 from smartscan.providers.embeddings.clip.text import ClipTextEmbedder
 from smartscan.providers.embeddings.dino.image import DinoSmallV2ImageEmbedder
 from smartscan.providers.embeddings.minilm.text import MiniLmTextEmbedder
 from smartscan.providers.embeddings.inception_resnet.face import InceptionResnetFaceEmbedder
+from smartscan.providers.embeddings.coalescing import CoalescingEmbedder
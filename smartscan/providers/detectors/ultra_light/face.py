@@ -3,23 +3,27 @@ from PIL import Image
 
 from smartscan.providers import DetectorProvider
 from smartscan.models.onnx_model import OnnxModel
+from smartscan.utils.image_utils import resize_crop
 from smartscan.errors import SmartScanError, ErrorCode
 
 
 class UltraLightFaceDetector(DetectorProvider):
+    input_size = (320, 240)
+
     def __init__(self, model_path: str):
         self._model = OnnxModel(model_path)
 
 
-    def detect(self, data: Image.Image):
+    def detect(self, data: Image.Image | np.ndarray):
         """Detect faces in a image."""
 
         if not self.is_initialized(): raise SmartScanError("Model not loaded", code=ErrorCode.MODEL_NOT_LOADED, details="Call init method first")        
-        input_name = self._model.get_inputs()[0].name
+        input_name = self._model.input_names[0]
         image_input = self._preprocess(data)
         outputs = self._model.run({input_name: image_input})
-        scores = outputs[0][0]
-        boxes = outputs[1][0]
+        # Copied because the model reuses its output buffers on the next call
+        scores = outputs[0][0].copy()
+        boxes = outputs[1][0].copy()
         return scores, boxes
     
     
@@ -28,23 +32,20 @@ class UltraLightFaceDetector(DetectorProvider):
 
     def init(self):
         self._model.load()
+        self._model.warmup_images(self._preprocess, self.input_size)
     
     def is_initialized(self):
         return self._model.is_load()
     
     @staticmethod
-    def _preprocess(image: Image.Image):
+    def _preprocess(image: Image.Image | np.ndarray):
         SIZE_X = 320
         SIZE_Y = 240
-        MODE = 'RGB'
         MEAN = (127, 127, 127)
 
-        # 1. Convert to RGB if not already
-        image = image.convert(MODE)
-        image = image.resize((SIZE_X, SIZE_Y))
-        image = np.array(image)
+        image = resize_crop(image, (SIZE_X, SIZE_Y))
         image_mean = np.array(MEAN, dtype=np.float32)
-        image = (image.astype(np.float32) - image_mean) / 128
+        image = (image - image_mean) / 128
         image = image.transpose(2, 0, 1)[None, ...]
         return image.astype(np.float32)
 
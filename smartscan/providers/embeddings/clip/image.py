@@ -2,10 +2,14 @@ import numpy as np
 from PIL import Image
 from smartscan.providers import  ImageEmbeddingProvider
 from smartscan.models.onnx_model import OnnxModel
+from smartscan.utils.image_utils import resize_crop, preprocess_batch, image_size
 from smartscan.errors import SmartScanError, ErrorCode
 
 
 class ClipImageEmbedder(ImageEmbeddingProvider):
+    # Smallest (w, h) an input must cover before preprocessing, used for reduced resolution decoding
+    input_size = (224, 224)
+
     def __init__(self, model_path: str):
         self._model = OnnxModel(model_path)
         self._embedding_dim = 512
@@ -14,11 +18,11 @@ class ClipImageEmbedder(ImageEmbeddingProvider):
     def embedding_dim(self) -> int:
         return self._embedding_dim
 
-    def embed(self, data: Image.Image):
+    def embed(self, data: Image.Image | np.ndarray):
         """Create vector embeddings for text or image files using an ONNX model."""
 
         if not self.is_initialized(): raise SmartScanError("Model not loaded", code=ErrorCode.MODEL_NOT_LOADED, details="Call init method first")
-        input_name = self._model.get_inputs()[0].name
+        input_name = self._model.input_names[0]
         image_input = self._preprocess(data)
         outputs = self._model.run({input_name: image_input})
         embedding = outputs[0][0]
@@ -26,13 +30,12 @@ class ClipImageEmbedder(ImageEmbeddingProvider):
         return embedding
     
 
-    def embed_batch(self, data: list[Image.Image]):
+    def embed_batch(self, data: list[Image.Image | np.ndarray] | np.ndarray):
         """Create vector embeddings for text or image files using an ONNX model."""
 
         if not self.is_initialized(): raise SmartScanError("Model not loaded", code=ErrorCode.MODEL_NOT_LOADED, details="Call init method first")        
-        input_name = self._model.get_inputs()[0].name
-        images = [self._preprocess(item) for item in data]
-        image_inputs = np.concatenate(images, axis=0)
+        input_name = self._model.input_names[0]
+        image_inputs = preprocess_batch(data, self._preprocess)
         outputs = self._model.run({input_name: image_inputs})
         embeddings = outputs[0]
         embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
@@ -43,34 +46,28 @@ class ClipImageEmbedder(ImageEmbeddingProvider):
 
     def init(self):
         self._model.load()
+        self._model.warmup_images(self._preprocess, self.input_size)
     
     def is_initialized(self):
         return self._model.is_load()
     
     @staticmethod
-    def _preprocess(image: Image.Image):
+    def _preprocess(image: Image.Image | np.ndarray):
         SIZE = 224
-        MODE = 'RGB'
         MEAN = (0.48145466, 0.4578275, 0.40821073)
         STD = (0.26862954, 0.26130258, 0.27577711)
-        INTERPOLATION = Image.BICUBIC
 
-        image = image.convert(MODE)
-        
         # Resize based on the shortest edge
-        w, h = image.size
+        w, h = image_size(image)
         scale = SIZE / min(w, h)
         new_w, new_h = round(w * scale), round(h * scale)
-        image = image.resize((new_w, new_h), INTERPOLATION)
-        
         left = (new_w - SIZE) // 2
         top = (new_h - SIZE) // 2
-        image = image.crop((left, top, left + SIZE, top + SIZE))
-        
-        img_array = np.array(image).astype(np.float32) / 255.0
-        
-        img_array = img_array.transpose(2, 0, 1)
-        img_array = np.expand_dims(img_array, axis=0)
+
+        img_array = resize_crop(image, (new_w, new_h), (left, top, left + SIZE, top + SIZE)) / 255.0
+
+        img_array = np.moveaxis(img_array, -1, -3)
+        img_array = img_array if img_array.ndim == 4 else np.expand_dims(img_array, axis=0)
         
         # channel-first normalization tensors so normalization must happen after transposing
         mean = np.array(MEAN).reshape(3, 1, 1)
@@ -18,11 +18,15 @@ class ClipTextEmbedder(TextEmbeddingProvider):
     def embedding_dim(self) -> int:
         return self._embedding_dim
 
+    @property
+    def max_len(self) -> int:
+        return self._max_len
+
     def embed(self, data: str):
         """Create vector embeddings for text using an ONNX model."""
 
         if not self.is_initialized(): raise SmartScanError("Model not loaded", code=ErrorCode.MODEL_NOT_LOADED, details="Call init method first")                
-        input_name = self._model.get_inputs()[0].name
+        input_name = self._model.input_names[0]
         token_ids = self._tokenize(data)
         token_input = np.array([token_ids], dtype=np.int64)
         outputs = self._model.run({input_name: token_input})
@@ -36,7 +40,7 @@ class ClipTextEmbedder(TextEmbeddingProvider):
 
         if not self.is_initialized(): raise SmartScanError("Model not loaded", code=ErrorCode.MODEL_NOT_LOADED, details="Call init method first")                
         
-        input_name = self._model.get_inputs()[0].name
+        input_name = self._model.input_names[0]
         token_ids_batch = [self._tokenize(item) for item in data]
         token_inputs = np.array(token_ids_batch, dtype=np.int64)
         outputs = self._model.run({input_name: token_inputs})
@@ -49,6 +53,7 @@ class ClipTextEmbedder(TextEmbeddingProvider):
 
     def init(self):
         self._model.load()
+        self._model.warmup_tokens(self._max_len)
     
     def is_initialized(self):
         return self._model.is_load()
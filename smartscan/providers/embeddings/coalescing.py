@@ -0,0 +1,118 @@
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Generic, TypeVar
+import numpy as np
+
+from smartscan.providers.embeddings.embedding_provider import EmbeddingProvider, WrappedEmbeddingProvider
+
+T = TypeVar("T")
+
+_STOP = object()
+
+
+class CoalescingEmbedder(WrappedEmbeddingProvider[T], Generic[T]):
+    """
+    Wraps a provider so that concurrent single-item `embed` calls are merged into one
+    `embed_batch` call. A batch is flushed once `max_batch_size` requests are queued or the
+    oldest request has waited `max_wait` seconds since it was submitted, so batching adds at
+    most that on top of a flush already in progress. Works from any number of threads
+    (`embed`) and from asyncio (`embed_async`).
+    """
+    def __init__(self, provider: EmbeddingProvider[T], max_batch_size: int = 32, max_wait: float = 0.005):
+        super().__init__(provider)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches_flushed = 0
+        self.items_flushed = 0
+        self._requests: queue.Queue = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items_flushed / self.batches_flushed if self.batches_flushed else 0.0
+
+    def embed(self, data: T) -> np.ndarray:
+        return self.submit(data).result()
+
+    async def embed_async(self, data: T) -> np.ndarray:
+        return await asyncio.wrap_future(self.submit(data))
+
+    def submit(self, data: T) -> Future:
+        """Queue one item and return a future resolving to its embedding."""
+        self._ensure_worker()
+        future = Future()
+        self._requests.put((data, future, time.monotonic()))
+        return future
+
+    def embed_batch(self, data: list[T]) -> np.ndarray:
+        # Callers that already have a batch gain nothing from coalescing
+        return self.provider.embed_batch(data)
+
+    def init(self):
+        self.provider.init()
+        self._ensure_worker()
+
+    def close_session(self):
+        self.stop()
+        self.provider.close_session()
+
+    def stop(self):
+        """Flush queued requests and stop the batching thread; it restarts on the next call."""
+        with self._lock:
+            worker = self._worker
+            self._worker = None
+        if worker is not None:
+            self._requests.put(_STOP)
+            worker.join()
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="coalescing-embedder", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is _STOP:
+                return
+            batch = [request]
+            # Measured from when the oldest request was submitted, so requests that queued
+            # up during a slow flush are sent right away rather than waiting max_wait again
+            deadline = request[2] + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    request = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is _STOP:
+                    stop = True
+                    break
+                batch.append(request)
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch: list[tuple[T, Future, float]]):
+        # Requests cancelled while queued are dropped
+        batch = [(data, future) for data, future, _ in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            embeddings = self.provider.embed_batch([data for data, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches_flushed += 1
+        self.items_flushed += len(batch)
+        for (_, future), embedding in zip(batch, embeddings):
+            future.set_result(embedding)
@@ -2,10 +2,14 @@ import numpy as np
 from PIL import Image
 from smartscan.providers import ImageEmbeddingProvider
 from smartscan.models.onnx_model import OnnxModel
+from smartscan.utils.image_utils import resize_crop, preprocess_batch, image_size
 from smartscan.errors import SmartScanError, ErrorCode
 
 
 class DinoSmallV2ImageEmbedder(ImageEmbeddingProvider):
+    # Shorter side is resized to 256 before the 224 centre crop
+    input_size = (256, 256)
+
     def __init__(self, model_path: str):
         self._model = OnnxModel(model_path)
 
@@ -13,11 +17,11 @@ class DinoSmallV2ImageEmbedder(ImageEmbeddingProvider):
     def embedding_dim(self) -> int:
         return 384
 
-    def embed(self, data: Image.Image):
+    def embed(self, data: Image.Image | np.ndarray):
         """Create vector embeddings for text or image files using an ONNX model."""
 
         if not self.is_initialized(): raise SmartScanError("Model not loaded", code=ErrorCode.MODEL_NOT_LOADED, details="Call init method first")
-        input_name = self._model.get_inputs()[0].name
+        input_name = self._model.input_names[0]
         image_input = self._preprocess(data)
         outputs = self._model.run({input_name: image_input})
         embedding = outputs[0][0]
@@ -25,13 +29,12 @@ class DinoSmallV2ImageEmbedder(ImageEmbeddingProvider):
         return embedding
     
 
-    def embed_batch(self, data: list[Image.Image]):
+    def embed_batch(self, data: list[Image.Image | np.ndarray] | np.ndarray):
         """Create vector embeddings for text or image files using an ONNX model."""
 
         if not self.is_initialized(): raise SmartScanError("Model not loaded", code=ErrorCode.MODEL_NOT_LOADED, details="Call init method first")
-        input_name = self._model.get_inputs()[0].name
-        images = [self._preprocess(item) for item in data]
-        image_inputs = np.concatenate(images, axis=0)
+        input_name = self._model.input_names[0]
+        image_inputs = preprocess_batch(data, self._preprocess)
         outputs = self._model.run({input_name: image_inputs})
         embeddings = outputs[0]
         embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
@@ -42,43 +45,37 @@ class DinoSmallV2ImageEmbedder(ImageEmbeddingProvider):
 
     def init(self):
         self._model.load()
+        self._model.warmup_images(self._preprocess, self.input_size)
     
     def is_initialized(self):
         return self._model.is_load()
     
     @staticmethod
-    def _preprocess(image: Image.Image) -> np.ndarray:
-        MODE = 'RGB'
+    def _preprocess(image: Image.Image | np.ndarray) -> np.ndarray:
         SIZE = 224
-        RESAMPLE=Image.BICUBIC
         MEAN=(0.485, 0.456, 0.406)
         STD=(0.229, 0.224, 0.225)
         
-        image = image.convert(MODE)
-
         # Resize shorter side to output_size / crop_pct (224/0.875 = 256)
         crop_pct = SIZE / (SIZE / 0.875) 
         scale_size = int(SIZE / crop_pct + 0.5) 
 
-        w, h = image.size
+        w, h = image_size(image)
         if h < w:
             new_h = scale_size
             new_w = int(w * (scale_size / h))
         else:
             new_w = scale_size
             new_h = int(h * (scale_size / w))
-        image = image.resize((new_w, new_h), resample=RESAMPLE)
-
         left = (new_w - SIZE) // 2
         top  = (new_h - SIZE) // 2
-        image = image.crop((left, top, left + SIZE, top + SIZE))
 
-        arr = np.asarray(image, dtype=np.float32) / 255.0
+        arr = resize_crop(image, (new_w, new_h), (left, top, left + SIZE, top + SIZE)) / 255.0
 
         mean = np.array(MEAN, dtype=np.float32)
         std  = np.array(STD,  dtype=np.float32)
         arr = (arr - mean) / std
 
-        arr = arr.transpose(2, 0, 1)
-        arr = np.expand_dims(arr, axis=0)
+        arr = np.moveaxis(arr, -1, -3)
+        arr = arr if arr.ndim == 4 else np.expand_dims(arr, axis=0)
         return arr.astype(dtype=np.float32)
\ No newline at end of file
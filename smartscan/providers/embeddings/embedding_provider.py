@@ -29,5 +29,33 @@ class EmbeddingProvider(ABC, Generic[T]):
     def close_session(self):
         pass
 
-ImageEmbeddingProvider = EmbeddingProvider[Image.Image]
+class WrappedEmbeddingProvider(EmbeddingProvider[T]):
+    """
+    Base for providers that wrap another one. Lifecycle calls go to `provider`, and so do
+    hints such as `input_size`, `tokenizer` and `max_len`, so callers treat the wrapper like
+    the provider itself.
+    """
+    def __init__(self, provider: EmbeddingProvider[T]):
+        self.provider = provider
+
+    @property
+    def embedding_dim(self) -> int:
+        return self.provider.embedding_dim
+
+    def init(self):
+        self.provider.init()
+
+    def is_initialized(self) -> bool:
+        return self.provider.is_initialized()
+
+    def close_session(self):
+        self.provider.close_session()
+
+    def __getattr__(self, name):
+        if name == "provider":
+            raise AttributeError(name)
+        return getattr(self.provider, name)
+
+# Image providers also accept uint8 HW or HWC arrays, and NHWC arrays for batches
+ImageEmbeddingProvider = EmbeddingProvider[Image.Image | np.ndarray]
 TextEmbeddingProvider = EmbeddingProvider[str]
\ No newline at end of file
@@ -17,11 +17,15 @@ class MiniLmTextEmbedder(TextEmbeddingProvider):
     def embedding_dim(self) -> int:
         return self._embedding_dim
 
+    @property
+    def max_len(self) -> int:
+        return self._max_len
+
     def embed(self, data: str):
         """Create vector embeddings for text using an ONNX model."""
 
         if not self.is_initialized(): raise SmartScanError("Model not loaded", code=ErrorCode.MODEL_NOT_LOADED, details="Call init method first")
-        input_name = self._model.get_inputs()[0].name
+        input_name = self._model.input_names[0]
         token_ids = self._tokenize(data)
         attention_mask = [1 if id != 0 else 0 for id in token_ids]
         token_input = np.array([token_ids], dtype=np.int64)
@@ -38,14 +42,14 @@ class MiniLmTextEmbedder(TextEmbeddingProvider):
         """Create vector embeddings for batch of text files using an ONNX model."""
 
         if not self.is_initialized(): raise SmartScanError("Model not loaded", code=ErrorCode.MODEL_NOT_LOADED, details="Call init method first")
-        input_names = self._model.get_inputs()
+        input_names = self._model.input_names
         token_ids_batch = [self._tokenize(item) for item in data]
         attention_mask_batch = [[1 if id != 0 else 0 for id in token_ids] for token_ids in token_ids_batch]
 
         token_inputs = np.array(token_ids_batch, dtype=np.int64)
         mask_inputs = np.array(attention_mask_batch, dtype=np.int64)
 
-        outputs = self._model.run({input_names[0].name: token_inputs, input_names[1].name: mask_inputs})
+        outputs = self._model.run({input_names[0]: token_inputs, input_names[1]: mask_inputs})
         embeddings = outputs[0]
         embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
         return embeddings
@@ -55,6 +59,7 @@ class MiniLmTextEmbedder(TextEmbeddingProvider):
 
     def init(self):
         self._model.load()
+        self._model.warmup_tokens(self._max_len, n_inputs=2)
     
     def is_initialized(self):
         return self._model.is_load()
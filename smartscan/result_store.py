@@ -0,0 +1,248 @@
+import time
+import sqlite3
+import asyncio
+import threading
+from pathlib import Path
+from typing import Iterator
+import numpy as np
+
+from smartscan.classifier import ClassificationResult
+from smartscan.processor import ProcessorListener
+from smartscan.search import SearchIndex
+from smartscan.errors import SmartScanError, ErrorCode
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    embedding BLOB NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS embeddings_name_path ON embeddings(name, path);
+CREATE INDEX IF NOT EXISTS embeddings_path ON embeddings(path);
+CREATE TABLE IF NOT EXISTS classifications (
+    path TEXT PRIMARY KEY,
+    class_id TEXT NOT NULL,
+    similarity REAL NOT NULL,
+    stage TEXT NOT NULL DEFAULT 'full',
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS classifications_class ON classifications(class_id);
+"""
+
+_INSERT_EMBEDDING = (
+    "INSERT INTO embeddings (name, path, dim, embedding, updated) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(name, path) DO UPDATE SET dim = excluded.dim, embedding = excluded.embedding, updated = excluded.updated"
+)
+_INSERT_CLASSIFICATION = "INSERT OR REPLACE INTO classifications (path, class_id, similarity, stage, updated) VALUES (?, ?, ?, ?, ?)"
+
+
+class SQLiteResultStore():
+    """
+    Indexing and classification results in a local SQLite database.
+
+    Embeddings are stored as raw float32 blobs under a `name` (e.g. the encoder), so one
+    database can hold several embedding spaces for the same files. The database runs in
+    WAL mode and every write call is one transaction with a bulk insert, so a batch costs
+    one commit, and readers are never blocked by a writer. Writing a path again replaces
+    its row. Reads open their own connection and stream vectors in chunks.
+    """
+    def __init__(self, path: str, synchronous: str = "NORMAL", timeout: float = 30.0):
+        self.path = Path(path)
+        self.synchronous = synchronous
+        self.timeout = timeout
+        self._conn: sqlite3.Connection | None = None
+        # Batches may be written from several sink threads at once
+        self._lock = threading.Lock()
+
+    def open(self):
+        if self._conn is not None:
+            return self
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = self._connect()
+        self._conn.executescript(_SCHEMA)
+        # Databases created before classifications recorded their cascade stage
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(classifications)")]
+        if "stage" not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE classifications ADD COLUMN stage TEXT NOT NULL DEFAULT 'full'")
+        return self
+
+    def close(self):
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.close()
+            self._conn = None
+
+    def is_open(self) -> bool:
+        return self._conn is not None
+
+    def write_embeddings(self, rows: list[tuple[str, np.ndarray]], name: str = ""):
+        """Insert or replace (path, embedding) rows in one transaction."""
+        self.write({name: rows})
+
+    def write_classifications(self, results: list[ClassificationResult]):
+        self.write(classifications=results)
+
+    def write(self, embeddings: dict[str, list[tuple[str, np.ndarray]]] | None = None, classifications: list[ClassificationResult] | None = None):
+        """Write embeddings (name -> (path, embedding) rows) and classifications in one transaction."""
+        now = time.time()
+        embedding_params = [
+            (name, path, *_to_blob(embedding), now)
+            for name, rows in (embeddings or {}).items() for path, embedding in rows
+        ]
+        classification_params = [(result.item, result.class_id, float(result.similarity), result.stage, now) for result in classifications or []]
+        if not embedding_params and not classification_params:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                if embedding_params:
+                    conn.executemany(_INSERT_EMBEDDING, embedding_params)
+                if classification_params:
+                    conn.executemany(_INSERT_CLASSIFICATION, classification_params)
+
+    def delete(self, paths: list[str]):
+        """Remove all results for `paths`."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany("DELETE FROM embeddings WHERE path = ?", [(path,) for path in paths])
+                conn.executemany("DELETE FROM classifications WHERE path = ?", [(path,) for path in paths])
+
+    def count(self, name: str = "") -> int:
+        with self._reader() as conn:
+            return conn.execute("SELECT COUNT(*) FROM embeddings WHERE name = ?", (name,)).fetchone()[0]
+
+    def names(self) -> list[str]:
+        with self._reader() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT name FROM embeddings")]
+
+    def get_embeddings(self, paths: list[str], name: str = "") -> dict[str, np.ndarray]:
+        """Stored embeddings of the given paths; missing paths are left out."""
+        found = {}
+        with self._reader() as conn:
+            # Stay below SQLite's bound parameter limit
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                query = f"SELECT path, embedding FROM embeddings WHERE name = ? AND path IN ({','.join('?' * len(chunk))})"
+                for path, blob in conn.execute(query, (name, *chunk)):
+                    found[path] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def iter_embeddings(self, name: str = "", chunk_size: int = 8192) -> Iterator[tuple[list[str], np.ndarray]]:
+        """
+        Stream (paths, (n, dim) float32 matrix) chunks in insertion order. Pages are read by
+        row id rather than OFFSET, so each chunk costs the same however far into the table it is.
+        """
+        with self._reader() as conn:
+            last_id = -1
+            while True:
+                rows = conn.execute(
+                    "SELECT id, path, dim, embedding FROM embeddings WHERE name = ? AND id > ? ORDER BY id LIMIT ?",
+                    (name, last_id, chunk_size),
+                ).fetchall()
+                if not rows:
+                    return
+                last_id = rows[-1][0]
+                dim = rows[0][2]
+                if any(row[2] != dim for row in rows):
+                    raise SmartScanError("Stored embeddings have different dimensions", code=ErrorCode.INVALID_ARGUMENT, details=name)
+                embeddings = np.frombuffer(b"".join(row[3] for row in rows), dtype=np.float32).reshape(len(rows), dim)
+                yield [row[1] for row in rows], embeddings
+
+    def load_embeddings(self, name: str = "") -> tuple[list[str], np.ndarray]:
+        """All paths and embeddings of `name` as one matrix."""
+        paths, chunks = [], []
+        for chunk_paths, embeddings in self.iter_embeddings(name):
+            paths.extend(chunk_paths)
+            chunks.append(embeddings)
+        if not chunks:
+            return [], np.empty((0, 0), dtype=np.float32)
+        return paths, np.concatenate(chunks)
+
+    def load_search_index(self, name: str = "", **kwargs) -> SearchIndex:
+        paths, embeddings = self.load_embeddings(name)
+        return SearchIndex(paths, embeddings, **kwargs)
+
+    def get_classifications(self, class_id: str | None = None) -> list[ClassificationResult]:
+        with self._reader() as conn:
+            if class_id is None:
+                rows = conn.execute("SELECT path, class_id, similarity, stage FROM classifications")
+            else:
+                rows = conn.execute("SELECT path, class_id, similarity, stage FROM classifications WHERE class_id = ?", (class_id,))
+            return [ClassificationResult(path, cls, similarity, stage) for path, cls, similarity, stage in rows]
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            raise SmartScanError("Result store not open", details="Call open method first")
+        return self._conn
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def _reader(self):
+        return _Reader(self._connect())
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _to_blob(embedding: np.ndarray) -> tuple[int, bytes]:
+    embedding = np.ascontiguousarray(embedding, dtype=np.float32).reshape(-1)
+    return embedding.shape[0], embedding.tobytes()
+
+
+class _Reader():
+    # sqlite3's own context manager only ends transactions, this also closes the connection
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self.conn
+
+    def __exit__(self, *exc):
+        self.conn.close()
+
+
+class SQLiteResultListener(ProcessorListener):
+    """
+    Persists the outputs of `FileIndexer` ((path, embedding)), `MultiEncoderImageIndexer`
+    ((path, {name: embedding})) and `FileClassifier` (`ClassificationResult`) to a
+    `SQLiteResultStore`. Each batch is written in one transaction off the event loop.
+    Subclass it to also handle progress or errors.
+    """
+    def __init__(self, store: SQLiteResultStore, name: str = ""):
+        self.store = store
+        self.name = name
+
+    async def on_active(self):
+        if not self.store.is_open():
+            await asyncio.to_thread(self.store.open)
+
+    async def on_batch_complete(self, batch):
+        if batch:
+            await asyncio.to_thread(self.write_batch, batch)
+
+    def write_batch(self, batch: list):
+        classifications = [out for out in batch if isinstance(out, ClassificationResult)]
+        embeddings: dict[str, list[tuple[str, np.ndarray]]] = {}
+        for out in batch:
+            if isinstance(out, ClassificationResult):
+                continue
+            path, value = out
+            if isinstance(value, dict):
+                for name, embedding in value.items():
+                    embeddings.setdefault(name, []).append((path, embedding))
+            else:
+                embeddings.setdefault(self.name, []).append((path, value))
+        self.store.write(embeddings, classifications)
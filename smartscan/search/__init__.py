@@ -0,0 +1,5 @@
+from smartscan.search.topk import topk, merge_topk
+from smartscan.search.exact import ExactSearchEngine
+from smartscan.search.quantization import CompressedEmbeddings, Float16Embeddings, Int8Embeddings, ProductQuantizedEmbeddings, QuantizedIndex, measure_recall
+from smartscan.search.searcher import SearchIndex, SearchSource, SearchQuery, SearchResult, MultiIndexSearcher
+from smartscan.search.reduction import DimensionReducer, PCAReducer, RandomProjectionReducer, ReducedEmbedder, ReductionReport, fit_reducer, evaluate_reducer
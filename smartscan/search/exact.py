@@ -0,0 +1,80 @@
+import os
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from smartscan.search.topk import topk, merge_topk
+
+
+class ExactSearchEngine():
+    """
+    Exact inner product top-k search over a large (N, dim) embedding matrix.
+
+    The matrix (which may be an `np.memmap`) is scanned in blocks sized to stay cache
+    friendly. Each block is scored with a matmul for the whole query batch and reduced
+    to its own top-k with `argpartition`, then merged into a running result, so extra
+    memory is O(block + k) rather than O(N). Blocks are scored on a thread pool since
+    NumPy releases the GIL inside BLAS; at most `2 * n_threads` blocks are in flight.
+    """
+    def __init__(self, embeddings: np.ndarray, block_size: int | None = None, n_threads: int | None = None, block_bytes: int = 8 << 20):
+        self.embeddings = embeddings
+        dim = embeddings.shape[1] if embeddings.ndim == 2 else 1
+        self.block_size = block_size or max(256, block_bytes // (dim * 4))
+        self.n_threads = n_threads or min(8, os.cpu_count() or 1)
+        self._pool: ThreadPoolExecutor | None = None
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def search(self, queries: np.ndarray, k: int = 10, rows: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Return (indices, scores), each (Q, k) and best first, optionally restricted to `rows`."""
+        queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self.embeddings.shape[1])
+        n_rows = len(self.embeddings) if rows is None else len(rows)
+        starts = range(0, n_rows, self.block_size)
+        indices = np.empty((len(queries), 0), dtype=np.int64)
+        scores = np.empty((len(queries), 0), dtype=np.float32)
+
+        if self.n_threads <= 1 or len(starts) <= 1:
+            for start in starts:
+                indices, scores = merge_topk(indices, scores, *self._search_block(queries, k, start, rows), k)
+            return indices, scores
+
+        pool = self._get_pool()
+        in_flight = deque()
+        for start in starts:
+            in_flight.append(pool.submit(self._search_block, queries, k, start, rows))
+            if len(in_flight) >= 2 * self.n_threads:
+                indices, scores = merge_topk(indices, scores, *in_flight.popleft().result(), k)
+        while in_flight:
+            indices, scores = merge_topk(indices, scores, *in_flight.popleft().result(), k)
+        return indices, scores
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _search_block(self, queries: np.ndarray, k: int, start: int, rows: np.ndarray | None) -> tuple[np.ndarray, np.ndarray]:
+        if rows is None:
+            end = min(start + self.block_size, len(self.embeddings))
+            block = self.embeddings[start:end]
+            block_rows = None
+        else:
+            block_rows = rows[start:start + self.block_size]
+            block = self.embeddings[block_rows]
+        block = np.asarray(block, dtype=np.float32)
+        block_indices, block_scores = topk(queries @ block.T, k)
+        if block_rows is None:
+            return block_indices + start, block_scores
+        return block_rows[block_indices], block_scores
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.n_threads, thread_name_prefix="exact-search")
+        return self._pool
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
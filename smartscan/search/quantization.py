@@ -0,0 +1,266 @@
+import numpy as np
+from abc import ABC, abstractmethod
+
+from smartscan.search.topk import topk, merge_topk
+from smartscan.search.exact import ExactSearchEngine
+from smartscan.errors import SmartScanError, ErrorCode
+
+
+class CompressedEmbeddings(ABC):
+    """Compact storage for (N, dim) embeddings that can be scored without decompressing."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._chunks: list[tuple[np.ndarray, ...]] = []
+        self._data: tuple[np.ndarray, ...] | None = None
+
+    def add(self, embeddings: np.ndarray):
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        self._chunks.append(self._encode(embeddings))
+
+    def __len__(self) -> int:
+        data = self._consolidate()
+        return 0 if data is None else len(data[0])
+
+    @property
+    def nbytes(self) -> int:
+        data = self._consolidate()
+        return 0 if data is None else sum(arr.nbytes for arr in data) + self._model_nbytes()
+
+    def scores(self, queries: np.ndarray, start: int = 0, end: int | None = None) -> np.ndarray:
+        """Similarity (inner product) of each query against stored rows `start:end`, shape (Q, rows)."""
+        data = self._consolidate()
+        if data is None:
+            return np.empty((len(queries), 0), dtype=np.float32)
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        return self._scores(queries, tuple(arr[start:end] for arr in data))
+
+    def reconstruct(self, indices: np.ndarray | None = None) -> np.ndarray:
+        data = self._consolidate()
+        if indices is not None:
+            data = tuple(arr[indices] for arr in data)
+        return self._decode(data)
+
+    def save(self, path: str):
+        data = self._consolidate()
+        arrays = {f"data_{i}": arr for i, arr in enumerate(data or ())}
+        np.savez(path, kind=type(self).__name__, dim=self.dim, **arrays, **self._model_arrays())
+
+    @classmethod
+    def load(cls, path: str) -> "CompressedEmbeddings":
+        with np.load(path) as f:
+            kind = str(f["kind"])
+            store_cls = next((c for c in _STORAGE_TYPES if c.__name__ == kind), None)
+            if store_cls is None:
+                raise SmartScanError("Unknown embedding storage type", code=ErrorCode.INVALID_ARGUMENT, details=kind)
+            store = store_cls._from_arrays(int(f["dim"]), f)
+            n_arrays = sum(1 for key in f.files if key.startswith("data_"))
+            if n_arrays:
+                store._chunks = [tuple(f[f"data_{i}"] for i in range(n_arrays))]
+        return store
+
+    def _consolidate(self) -> tuple[np.ndarray, ...] | None:
+        if self._chunks:
+            chunks = ([self._data] if self._data is not None else []) + self._chunks
+            self._data = tuple(np.concatenate(parts, axis=0) for parts in zip(*chunks))
+            self._chunks = []
+        return self._data
+
+    def _model_nbytes(self) -> int:
+        return sum(arr.nbytes for arr in self._model_arrays().values())
+
+    def _model_arrays(self) -> dict[str, np.ndarray]:
+        return {}
+
+    @classmethod
+    def _from_arrays(cls, dim: int, arrays) -> "CompressedEmbeddings":
+        return cls(dim)
+
+    @abstractmethod
+    def _encode(self, embeddings: np.ndarray) -> tuple[np.ndarray, ...]:
+        pass
+
+    @abstractmethod
+    def _decode(self, data: tuple[np.ndarray, ...]) -> np.ndarray:
+        pass
+
+    @abstractmethod
+    def _scores(self, queries: np.ndarray, data: tuple[np.ndarray, ...]) -> np.ndarray:
+        pass
+
+
+class Float16Embeddings(CompressedEmbeddings):
+    """Half precision storage, 2x smaller than float32."""
+
+    def _encode(self, embeddings):
+        return (embeddings.astype(np.float16),)
+
+    def _decode(self, data):
+        return data[0].astype(np.float32)
+
+    def _scores(self, queries, data):
+        return queries @ data[0].astype(np.float32).T
+
+
+class Int8Embeddings(CompressedEmbeddings):
+    """Per-vector scaled int8 storage, ~4x smaller than float32."""
+
+    def _encode(self, embeddings):
+        scales = np.abs(embeddings).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(embeddings / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def _decode(self, data):
+        codes, scales = data
+        return codes.astype(np.float32) * scales[:, None]
+
+    def _scores(self, queries, data):
+        codes, scales = data
+        return (queries @ codes.astype(np.float32).T) * scales[None, :]
+
+
+class ProductQuantizedEmbeddings(CompressedEmbeddings):
+    """
+    Product quantization: each vector is split into `n_subvectors` parts and every part is
+    replaced by the id of its nearest centroid, giving `n_subvectors` bytes per vector.
+    Scoring uses asymmetric distance: queries stay in float32 and are compared with the
+    centroids once, then each stored row is scored by summing table lookups.
+    """
+
+    def __init__(self, dim: int, n_subvectors: int = 64, n_centroids: int = 256):
+        super().__init__(dim)
+        if dim % n_subvectors != 0:
+            raise SmartScanError("Embedding dimension must be divisible by n_subvectors", code=ErrorCode.INVALID_ARGUMENT, details=f"dim={dim}, n_subvectors={n_subvectors}")
+        if n_centroids > 256:
+            raise SmartScanError("At most 256 centroids are supported", code=ErrorCode.INVALID_ARGUMENT)
+        self.n_subvectors = n_subvectors
+        self.n_centroids = n_centroids
+        self.sub_dim = dim // n_subvectors
+        self.codebooks: np.ndarray | None = None # (n_subvectors, n_centroids, sub_dim)
+
+    def is_trained(self) -> bool:
+        return self.codebooks is not None
+
+    def train(self, sample: np.ndarray, n_iter: int = 20, seed: int = 0):
+        """Learn one k-means codebook per subspace from a representative sample."""
+        sample = np.asarray(sample, dtype=np.float32).reshape(-1, self.dim)
+        if len(sample) < self.n_centroids:
+            raise SmartScanError("Not enough samples to train codebooks", code=ErrorCode.INVALID_ARGUMENT, details=f"Need at least {self.n_centroids}, got {len(sample)}")
+        rng = np.random.default_rng(seed)
+        subspaces = sample.reshape(len(sample), self.n_subvectors, self.sub_dim)
+        self.codebooks = np.stack([_kmeans(subspaces[:, j], self.n_centroids, n_iter, rng) for j in range(self.n_subvectors)])
+
+    def _encode(self, embeddings):
+        if not self.is_trained():
+            raise SmartScanError("Codebooks not trained", code=ErrorCode.INVALID_ARGUMENT, details="Call train method first")
+        subspaces = embeddings.reshape(len(embeddings), self.n_subvectors, self.sub_dim)
+        codes = np.empty((len(embeddings), self.n_subvectors), dtype=np.uint8)
+        for j in range(self.n_subvectors):
+            codes[:, j] = _nearest_centroid(subspaces[:, j], self.codebooks[j])
+        return (codes,)
+
+    def _decode(self, data):
+        codes = data[0]
+        parts = [self.codebooks[j][codes[:, j]] for j in range(self.n_subvectors)]
+        return np.concatenate(parts, axis=1)
+
+    def _scores(self, queries, data):
+        codes = data[0]
+        # Lookup table of query/centroid inner products, (Q, n_subvectors, n_centroids)
+        lut = np.einsum("qjd,jcd->qjc", queries.reshape(len(queries), self.n_subvectors, self.sub_dim), self.codebooks)
+        scores = np.zeros((len(queries), len(codes)), dtype=np.float32)
+        for j in range(self.n_subvectors):
+            scores += lut[:, j, codes[:, j]]
+        return scores
+
+    def _model_arrays(self):
+        if self.codebooks is None:
+            return {}
+        return {"codebooks": self.codebooks}
+
+    @classmethod
+    def _from_arrays(cls, dim, arrays):
+        codebooks = arrays["codebooks"]
+        store = cls(dim, n_subvectors=codebooks.shape[0], n_centroids=codebooks.shape[1])
+        store.codebooks = codebooks
+        return store
+
+
+_STORAGE_TYPES = (Float16Embeddings, Int8Embeddings, ProductQuantizedEmbeddings)
+
+
+class QuantizedIndex():
+    """
+    Top-k search over compressed embeddings.
+
+    Rows are scored block by block directly on the compressed representation. When
+    `originals` (float32, e.g. an `np.memmap` kept on disk) is given, the best `rerank`
+    candidates are rescored exactly before the final top-k is taken.
+    """
+    def __init__(self, storage: CompressedEmbeddings, originals: np.ndarray | None = None, block_size: int = 16384):
+        self.storage = storage
+        self.originals = originals
+        self.block_size = block_size
+
+    def search(self, queries: np.ndarray, k: int = 10, rerank: int = 0) -> tuple[np.ndarray, np.ndarray]:
+        """Return (indices, scores), each (Q, k), best first."""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.storage.dim)
+        n_candidates = max(k, rerank) if self.originals is not None else k
+        indices, scores = self._search_compressed(queries, n_candidates)
+        if self.originals is None or rerank <= 0:
+            return indices[:, :k], scores[:, :k]
+        return self._rerank(queries, indices, k)
+
+    def _search_compressed(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        indices = np.empty((len(queries), 0), dtype=np.int64)
+        scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self.storage), self.block_size):
+            block_scores = self.storage.scores(queries, start, start + self.block_size)
+            block_indices, block_top = topk(block_scores, k)
+            indices, scores = merge_topk(indices, scores, block_indices + start, block_top, k)
+        return indices, scores
+
+    def _rerank(self, queries: np.ndarray, candidates: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        indices = np.empty((len(queries), min(k, candidates.shape[1])), dtype=np.int64)
+        scores = np.empty(indices.shape, dtype=np.float32)
+        for q, (query, rows) in enumerate(zip(queries, candidates)):
+            # Sorted row order makes memmap reads sequential
+            sorted_rows = np.sort(rows)
+            exact = np.asarray(self.originals[sorted_rows], dtype=np.float32) @ query
+            best, best_scores = topk(exact[None, :], k)
+            indices[q] = sorted_rows[best[0]]
+            scores[q] = best_scores[0]
+        return indices, scores
+
+
+def measure_recall(index: QuantizedIndex, queries: np.ndarray, embeddings: np.ndarray, k: int = 10, rerank: int = 0) -> float:
+    """Mean fraction of the exact float32 top-k recovered by `index`."""
+    queries = np.asarray(queries, dtype=np.float32)
+    with ExactSearchEngine(embeddings) as exact:
+        expected, _ = exact.search(queries, k)
+    found, _ = index.search(queries, k, rerank)
+    hits = [len(np.intersect1d(a, b)) for a, b in zip(expected, found)]
+    return float(np.mean(hits) / k)
+
+
+def _nearest_centroid(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # argmin ||x - c||^2 == argmin (||c||^2 - 2 x.c)
+    distances = (centroids ** 2).sum(axis=1)[None, :] - 2 * (x @ centroids.T)
+    return distances.argmin(axis=1)
+
+
+def _kmeans(x: np.ndarray, n_clusters: int, n_iter: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = x[rng.choice(len(x), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assignment = _nearest_centroid(x, centroids)
+        counts = np.bincount(assignment, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, x)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Reseed empty clusters from random points so every code stays useful
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = x[rng.choice(len(x), len(empty), replace=False)]
+    return centroids.astype(np.float32)
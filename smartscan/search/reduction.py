@@ -0,0 +1,173 @@
+import numpy as np
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from smartscan.search.exact import ExactSearchEngine
+from smartscan.providers.embeddings.embedding_provider import EmbeddingProvider, WrappedEmbeddingProvider
+from smartscan.errors import SmartScanError, ErrorCode
+
+
+class DimensionReducer(ABC):
+    """
+    Linear projection of (N, input_dim) embeddings to output_dim. Outputs are renormalised
+    so inner products stay cosine similarities. Documents and queries must go through the
+    same fitted reducer.
+    """
+    def __init__(self, input_dim: int, output_dim: int):
+        if output_dim > input_dim:
+            raise SmartScanError("Output dimension must not exceed input dimension", code=ErrorCode.INVALID_ARGUMENT, details=f"{output_dim} > {input_dim}")
+        self.input_dim = input_dim
+        self.output_dim = output_dim
+        self.mean: np.ndarray | None = None
+        self.components: np.ndarray | None = None # (output_dim, input_dim)
+        # Fraction of the sample's variance kept by the projection
+        self.retained_variance: float | None = None
+
+    def is_fitted(self) -> bool:
+        return self.components is not None
+
+    @abstractmethod
+    def fit(self, sample: np.ndarray) -> "DimensionReducer":
+        pass
+
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        if not self.is_fitted():
+            raise SmartScanError("Reducer not fitted", code=ErrorCode.INVALID_ARGUMENT, details="Call fit method first")
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim == 0 or embeddings.shape[-1] != self.input_dim:
+            raise SmartScanError("Embedding dimension does not match reducer", code=ErrorCode.INVALID_ARGUMENT, details=f"Expected {self.input_dim}, got {embeddings.shape[-1] if embeddings.ndim else 0}")
+        reduced = (embeddings.reshape(-1, self.input_dim) - self.mean) @ self.components.T
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        reduced /= norms
+        return reduced.reshape(*embeddings.shape[:-1], self.output_dim)
+
+    def save(self, path: str):
+        if not self.is_fitted():
+            raise SmartScanError("Reducer not fitted", code=ErrorCode.INVALID_ARGUMENT, details="Call fit method first")
+        np.savez(path, kind=type(self).__name__, mean=self.mean, components=self.components, retained_variance=np.nan if self.retained_variance is None else self.retained_variance)
+
+    @classmethod
+    def load(cls, path: str) -> "DimensionReducer":
+        with np.load(path) as f:
+            kind = str(f["kind"])
+            reducer_cls = next((c for c in _REDUCER_TYPES if c.__name__ == kind), None)
+            if reducer_cls is None:
+                raise SmartScanError("Unknown reducer type", code=ErrorCode.INVALID_ARGUMENT, details=kind)
+            components = f["components"]
+            reducer = reducer_cls(components.shape[1], components.shape[0])
+            reducer.mean = f["mean"]
+            reducer.components = components
+            retained_variance = float(f["retained_variance"])
+        reducer.retained_variance = None if np.isnan(retained_variance) else retained_variance
+        return reducer
+
+    def _sample(self, sample: np.ndarray) -> np.ndarray:
+        return np.asarray(sample, dtype=np.float32).reshape(-1, self.input_dim)
+
+
+class PCAReducer(DimensionReducer):
+    """Projects onto the top principal components of a sample, found with an SVD."""
+
+    def fit(self, sample):
+        sample = self._sample(sample)
+        if len(sample) < self.output_dim:
+            raise SmartScanError("Not enough samples to fit PCA", code=ErrorCode.INVALID_ARGUMENT, details=f"Need at least {self.output_dim}, got {len(sample)}")
+        mean = sample.mean(axis=0)
+        centered = sample - mean
+        _, singular_values, vt = np.linalg.svd(centered, full_matrices=False)
+        variance = singular_values ** 2
+        self.mean = mean
+        self.components = np.ascontiguousarray(vt[:self.output_dim], dtype=np.float32)
+        self.retained_variance = float(variance[:self.output_dim].sum() / variance.sum()) if variance.sum() > 0 else 1.0
+        return self
+
+
+class RandomProjectionReducer(DimensionReducer):
+    """Gaussian random projection; needs no training data, approximately preserves inner products."""
+
+    def __init__(self, input_dim: int, output_dim: int, seed: int = 0):
+        super().__init__(input_dim, output_dim)
+        self.seed = seed
+
+    def fit(self, sample=None):
+        rng = np.random.default_rng(self.seed)
+        # Orthonormal rows keep the projection well conditioned at small output dimensions
+        q, _ = np.linalg.qr(rng.standard_normal((self.input_dim, self.output_dim)))
+        self.components = np.ascontiguousarray(q.T, dtype=np.float32)
+        self.mean = np.zeros(self.input_dim, dtype=np.float32)
+        if sample is not None and len(sample):
+            sample = self._sample(sample)
+            centered = sample - sample.mean(axis=0)
+            total = float((centered ** 2).sum())
+            self.retained_variance = float(((centered @ self.components.T) ** 2).sum() / total) if total > 0 else 1.0
+        return self
+
+
+_REDUCER_TYPES = (PCAReducer, RandomProjectionReducer)
+
+
+def fit_reducer(sample: np.ndarray, output_dim: int, method: str = "pca", seed: int = 0) -> DimensionReducer:
+    """Fit a PCA reducer, falling back to random projection when the sample is too small or the SVD fails."""
+    sample = np.asarray(sample, dtype=np.float32)
+    input_dim = sample.shape[-1]
+    if method == "pca" and len(sample) >= output_dim:
+        try:
+            return PCAReducer(input_dim, output_dim).fit(sample)
+        except np.linalg.LinAlgError:
+            pass
+    elif method not in ("pca", "random"):
+        raise SmartScanError("Unknown reduction method", code=ErrorCode.INVALID_ARGUMENT, details=method)
+    return RandomProjectionReducer(input_dim, output_dim, seed).fit(sample)
+
+
+@dataclass
+class ReductionReport:
+    input_dim: int
+    output_dim: int
+    retained_variance: float | None
+    recall: float
+    compression: float
+
+
+def evaluate_reducer(reducer: DimensionReducer, embeddings: np.ndarray, queries: np.ndarray | None = None, k: int = 10, n_queries: int = 100, seed: int = 0) -> ReductionReport:
+    """
+    Compare top-k search over reduced embeddings with exact full-dimension search.
+    Without `queries`, a random sample of the embeddings is used, ignoring each query's own row.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    exclude_self = queries is None
+    if exclude_self:
+        rows = np.random.default_rng(seed).choice(len(embeddings), min(n_queries, len(embeddings)), replace=False)
+        queries = embeddings[rows]
+    queries = np.asarray(queries, dtype=np.float32)
+    n = k + 1 if exclude_self else k
+
+    with ExactSearchEngine(embeddings) as full, ExactSearchEngine(reducer.transform(embeddings)) as reduced:
+        expected, _ = full.search(queries, n)
+        found, _ = reduced.search(reducer.transform(queries), n)
+
+    hits = []
+    for i, (a, b) in enumerate(zip(expected, found)):
+        if exclude_self:
+            a, b = a[a != rows[i]][:k], b[b != rows[i]][:k]
+        hits.append(len(np.intersect1d(a, b)) / max(len(a), 1))
+    return ReductionReport(reducer.input_dim, reducer.output_dim, reducer.retained_variance, float(np.mean(hits)), reducer.input_dim / reducer.output_dim)
+
+
+class ReducedEmbedder(WrappedEmbeddingProvider):
+    """Applies a fitted reducer to a provider's outputs, e.g. to embed queries for a reduced index."""
+
+    def __init__(self, provider: EmbeddingProvider, reducer: DimensionReducer):
+        super().__init__(provider)
+        self.reducer = reducer
+
+    @property
+    def embedding_dim(self) -> int:
+        return self.reducer.output_dim
+
+    def embed(self, data):
+        return self.reducer.transform(self.provider.embed(data))
+
+    def embed_batch(self, data):
+        return self.reducer.transform(self.provider.embed_batch(data))
@@ -0,0 +1,197 @@
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Any, Callable, Literal
+from PIL import Image
+
+from smartscan.providers import EmbeddingProvider
+from smartscan.search.exact import ExactSearchEngine
+from smartscan.errors import SmartScanError, ErrorCode
+
+Modality = Literal["text", "image"]
+FusionMethod = Literal["weighted", "rrf"]
+# column -> value, collection of values, or predicate over the column array returning a boolean mask
+Filters = dict[str, Any | list | tuple | set | Callable[[np.ndarray], np.ndarray]]
+
+
+@dataclass
+class SearchIndex:
+    """
+    Normalised embeddings with their item ids and optional columnar metadata
+    (column name -> array with one value per row) used for filtering. The search engine
+    keeps a thread pool once used; `close` it (or use the index as a context manager)
+    when done.
+    """
+    ids: list[str]
+    embeddings: np.ndarray
+    metadata: dict[str, np.ndarray] = field(default_factory=dict)
+    block_size: int | None = None
+    n_threads: int | None = None
+
+    def __post_init__(self):
+        if len(self.ids) != len(self.embeddings):
+            raise SmartScanError("Number of ids does not match number of embeddings", code=ErrorCode.INVALID_ARGUMENT)
+        self.metadata = {name: np.asarray(column) for name, column in self.metadata.items()}
+        self.engine = ExactSearchEngine(self.embeddings, self.block_size, self.n_threads)
+
+    def filter_rows(self, filters: Filters | None) -> np.ndarray | None:
+        """Row indices matching all filters, or None when every row matches."""
+        if not filters:
+            return None
+        mask = np.ones(len(self.ids), dtype=bool)
+        for name, condition in filters.items():
+            column = self.metadata.get(name)
+            if column is None:
+                raise SmartScanError("Unknown metadata column", code=ErrorCode.INVALID_ARGUMENT, details=name)
+            if callable(condition):
+                mask &= np.asarray(condition(column), dtype=bool)
+            elif isinstance(condition, (list, tuple, set)):
+                mask &= np.isin(column, list(condition))
+            else:
+                mask &= column == condition
+        return np.flatnonzero(mask)
+
+    def search(self, queries: np.ndarray, k: int, rows: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k row indices and scores for a (Q, dim) batch of queries, restricted to `rows` if given."""
+        return self.engine.search(queries, k, rows)
+
+    def close(self):
+        self.engine.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@dataclass
+class SearchSource:
+    """An index together with the encoders able to embed queries into its space, keyed by query modality."""
+    name: str
+    index: SearchIndex
+    encoders: dict[Modality, EmbeddingProvider]
+    weight: float = 1.0
+
+
+@dataclass
+class SearchQuery:
+    data: str | Image.Image
+    filters: Filters | None = None
+
+    @property
+    def modality(self) -> Modality:
+        return "text" if isinstance(self.data, str) else "image"
+
+
+@dataclass
+class SearchResult:
+    item: str
+    score: float
+    source_scores: dict[str, float] = field(default_factory=dict)
+
+
+class MultiIndexSearcher():
+    """
+    Answers many text and/or image queries at once against one or more indexes.
+
+    Queries are embedded with a single `embed_batch` per encoder and modality, queries sharing
+    the same filters are scored together with one blocked matrix multiply per index, and
+    per-index rankings are fused by weighted score sum or weighted reciprocal rank fusion.
+    """
+    def __init__(self, sources: list[SearchSource], fusion: FusionMethod = "weighted", rrf_k: int = 60, candidates_per_source: int | None = None):
+        self.sources = sources
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+        self.candidates_per_source = candidates_per_source
+
+    def close(self):
+        """Close the indexes of all sources."""
+        for index in {id(source.index): source.index for source in self.sources}.values():
+            index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def search(self, queries: list[SearchQuery], k: int = 10) -> list[list[SearchResult]]:
+        n_candidates = max(k, self.candidates_per_source or 0)
+        query_embeddings = self._embed_queries(queries)
+        # Row of each query within its modality's embedding batch
+        offsets: dict[Modality, int] = {}
+        rows_in_batch = []
+        for query in queries:
+            rows_in_batch.append(offsets.get(query.modality, 0))
+            offsets[query.modality] = rows_in_batch[-1] + 1
+        fused: list[dict[str, SearchResult]] = [{} for _ in queries]
+
+        for source in self.sources:
+            for modality, encoder in source.encoders.items():
+                embeddings = query_embeddings[(id(encoder), modality)]
+                for positions in self._group_by_filters(queries, modality).values():
+                    rows = source.index.filter_rows(queries[positions[0]].filters)
+                    vectors = embeddings[[rows_in_batch[p] for p in positions]]
+                    indices, scores = source.index.search(vectors, n_candidates, rows)
+                    for position, row_indices, row_scores in zip(positions, indices, scores):
+                        self._fuse(fused[position], source, row_indices, row_scores)
+
+        return [sorted(results.values(), key=lambda r: r.score, reverse=True)[:k] for results in fused]
+
+    def _embed_queries(self, queries: list[SearchQuery]) -> dict[tuple[int, Modality], np.ndarray]:
+        embeddings = {}
+        for source in self.sources:
+            for modality, encoder in source.encoders.items():
+                key = (id(encoder), modality)
+                if key in embeddings:
+                    continue
+                data = [query.data for query in queries if query.modality == modality]
+                embeddings[key] = encoder.embed_batch(data) if data else np.empty((0, encoder.embedding_dim), dtype=np.float32)
+        return embeddings
+
+    @staticmethod
+    def _group_by_filters(queries: list[SearchQuery], modality: Modality) -> dict[tuple, list[int]]:
+        groups: dict[tuple, list[int]] = {}
+        for position, query in enumerate(queries):
+            if query.modality != modality:
+                continue
+            groups.setdefault(_filters_key(query.filters), []).append(position)
+        return groups
+
+    def _fuse(self, results: dict[str, SearchResult], source: SearchSource, row_indices: np.ndarray, row_scores: np.ndarray):
+        for rank, (row, score) in enumerate(zip(row_indices, row_scores)):
+            item = source.index.ids[row]
+            result = results.get(item)
+            if result is None:
+                result = results[item] = SearchResult(item, 0.0)
+            result.source_scores[source.name] = float(score)
+            if self.fusion == "rrf":
+                result.score += source.weight / (self.rrf_k + rank + 1)
+            else:
+                result.score += source.weight * float(score)
+
+
+def _filters_key(filters: Filters | None) -> tuple:
+    """Hashable key equal only for filters selecting the same rows; unhashable filters get a key of their own."""
+    if not filters:
+        return ()
+    try:
+        return tuple(sorted((name, _filter_value_key(condition)) for name, condition in filters.items()))
+    except TypeError:
+        return ("id", id(filters))
+
+
+def _filter_value_key(value) -> object:
+    if isinstance(value, np.ndarray):
+        # Full contents, unlike repr which elides the middle of large arrays
+        return ("array", value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, (set, frozenset)):
+        return ("set", frozenset(_filter_value_key(v) for v in value))
+    if isinstance(value, (list, tuple)):
+        return ("seq", tuple(_filter_value_key(v) for v in value))
+    if callable(value):
+        # Predicates are only known to match when they are the same object
+        return ("callable", id(value))
+    hash(value)
+    return ("value", value)
+
@@ -0,0 +1,24 @@
+import numpy as np
+
+
+def topk(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Indices and scores of the `k` highest scores per row of a (Q, N) matrix, best first."""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(scores.dtype)
+    if k < scores.shape[1]:
+        indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        indices = np.broadcast_to(np.arange(scores.shape[1]), scores.shape).copy()
+    top_scores = np.take_along_axis(scores, indices, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return np.take_along_axis(indices, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def merge_topk(indices_a: np.ndarray, scores_a: np.ndarray, indices_b: np.ndarray, scores_b: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Merge two per-row top-k results (e.g. running result and a new block) into one."""
+    indices = np.concatenate([indices_a, indices_b], axis=1)
+    scores = np.concatenate([scores_a, scores_b], axis=1)
+    positions, top_scores = topk(scores, k)
+    return np.take_along_axis(indices, positions, axis=1), top_scores
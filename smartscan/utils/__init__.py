@@ -1,2 +1,6 @@
-from smartscan.utils.file_utils import read_text_file, get_days_since_last_modified, get_child_dirs, get_files_from_dirs, get_frames_from_video, are_valid_files
-from smartscan.utils.image_utils import nms, draw_boxes, crop_faces
\ No newline at end of file
+from smartscan.utils.file_utils import read_text_file, get_days_since_last_modified, get_child_dirs, get_files_from_dirs, get_frames_from_video, are_valid_files, get_file_type
+from smartscan.utils.image_utils import nms, draw_boxes, crop_faces, load_image, image_size, to_rgb_array, resize_array, resize_crop, preprocess_batch, shrink_to_cover
+from smartscan.utils.text_utils import iter_text_blocks, iter_token_chunks, sample_token_chunks
+from smartscan.utils.video_utils import probe_video, iter_video_frames, frame_signature, frame_difference
+from smartscan.utils.cancellation import CancellationToken, current_token, check_cancelled, cancellable_process
+from smartscan.utils.prefetch import FilePrefetcher, PrefetchStats, current_prefetcher, take_prefetched, open_input
@@ -0,0 +1,114 @@
+import time
+import threading
+import subprocess
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable
+
+from smartscan.errors import SmartScanError, ErrorCode
+
+
+class CancellationToken():
+    """
+    Cooperative cancellation for work running in a worker thread. Long running steps check
+    the token between stages and register callbacks (e.g. killing a child process) that run
+    as soon as the token is cancelled.
+    """
+    def __init__(self, timeout: float | None = None):
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self._cancelled = False
+        self._callbacks: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def start(self, timeout: float | None):
+        """(Re)start the deadline clock, e.g. once queued work actually begins."""
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def remaining(self) -> float | None:
+        """Seconds left before the deadline, or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def register(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run `callback` on cancellation (immediately if already cancelled); returns an unregister function."""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def raise_if_cancelled(self):
+        if self._cancelled or (self.deadline is not None and time.monotonic() >= self.deadline):
+            raise SmartScanError("Item timed out", code=ErrorCode.TIMEOUT)
+
+    def _unregister(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+_current_token: ContextVar[CancellationToken | None] = ContextVar("smartscan_cancellation_token", default=None)
+
+
+def current_token() -> CancellationToken | None:
+    return _current_token.get()
+
+
+def set_current_token(token: CancellationToken | None):
+    _current_token.set(token)
+
+
+def check_cancelled():
+    """Raise a TIMEOUT error if the current item's token was cancelled; a no-op outside timed work."""
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+@contextmanager
+def cancellable_process(proc: subprocess.Popen):
+    """Kill `proc` when the current token is cancelled, raising a TIMEOUT error once it exits."""
+    token = _current_token.get()
+    if token is None:
+        yield proc
+        return
+    unregister = token.register(proc.kill)
+    try:
+        yield proc
+    except Exception:
+        # Errors caused by the kill (e.g. truncated output) are reported as the timeout
+        token.raise_if_cancelled()
+        raise
+    finally:
+        unregister()
+    token.raise_if_cancelled()
+
+
+def communicate(proc: subprocess.Popen) -> tuple[bytes, bytes]:
+    """`proc.communicate()` bounded by the current token's deadline."""
+    token = _current_token.get()
+    with cancellable_process(proc):
+        try:
+            return proc.communicate(timeout=token.remaining() if token is not None else None)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise SmartScanError("Item timed out", code=ErrorCode.TIMEOUT)
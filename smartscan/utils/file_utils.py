@@ -2,12 +2,15 @@ import os
 import datetime
 import numpy as np
 import subprocess
-import re
 from pathlib import Path
 from smartscan.errors import SmartScanError, ErrorCode
+from smartscan.constants import SupportedFileTypes
+from smartscan.utils.video_utils import probe_video
+from smartscan.utils.cancellation import cancellable_process
+from smartscan.utils.prefetch import open_input
 
 def read_text_file(filepath: str):
-    with open(filepath, 'r', encoding='utf-8') as file:
+    with open_input(filepath, 'r', encoding='utf-8') as file:
         return file.read()       
 
 
@@ -81,23 +84,7 @@ def get_frames_from_video(video_path: str, n_frames: int):
     Extract `n` evenly spaced frames from a video using one FFmpeg process.
     Returns a list of frames as NumPy arrays (H, W, 3, dtype=uint8) at original resolution.
     """
-    cmd_probe = ["ffmpeg", "-i", video_path]
-    proc = subprocess.Popen(cmd_probe, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
-    _, err = proc.communicate()
-    err = err.decode()
-
-    # Original resolution
-    match = re.search(r", (\d+)x(\d+)", err)
-    if not match:
-        raise ValueError("Could not determine video dimensions")
-    width, height = int(match.group(1)), int(match.group(2))
-
-    # Duration
-    match_dur = re.search(r"Duration: (\d+):(\d+):(\d+\.\d+)", err)
-    if not match_dur:
-        raise ValueError("Could not determine video duration")
-    hours, minutes, seconds = map(float, match_dur.groups())
-    duration = hours*3600 + minutes*60 + seconds
+    width, height, duration = probe_video(video_path)
 
     cmd = [
         "ffmpeg",
@@ -114,18 +101,32 @@ def get_frames_from_video(video_path: str, n_frames: int):
     frame_size = width * height * 3
     frames = []
 
-    while True:
-        raw = proc.stdout.read(frame_size)
-        if len(raw) < frame_size:
-            break
-        frame = np.frombuffer(raw, dtype=np.uint8).reshape((height, width, 3))
-        frames.append(frame)
-
-    proc.stdout.close()
-    proc.wait()
+    try:
+        with cancellable_process(proc):
+            while True:
+                raw = proc.stdout.read(frame_size)
+                if len(raw) < frame_size:
+                    break
+                frame = np.frombuffer(raw, dtype=np.uint8).reshape((height, width, 3))
+                frames.append(frame)
+    finally:
+        proc.stdout.close()
+        proc.wait()
     return frames
 
 
+def get_file_type(path: str) -> str | None:
+    """"image", "text" or "video" for supported files, otherwise None."""
+    path = path.lower()
+    if path.endswith(SupportedFileTypes.IMAGE):
+        return "image"
+    if path.endswith(SupportedFileTypes.TEXT):
+        return "text"
+    if path.endswith(SupportedFileTypes.VIDEO):
+        return "video"
+    return None
+
+
 def are_valid_files(allowed_exts: list[str], files: list[str]) -> bool:
     return all(path.lower().endswith(allowed_exts) for path in files)
     
@@ -1,5 +1,62 @@
+import io
+from typing import Callable
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, ExifTags
+
+from smartscan.errors import SmartScanError, ErrorCode
+from smartscan.utils.prefetch import take_prefetched
+
+_EXIF_THUMBNAIL_OFFSET = 0x0201
+_EXIF_THUMBNAIL_LENGTH = 0x0202
+_EXIF_HEADER_SIZE = 6 # b"Exif\x00\x00" precedes the TIFF header offsets are relative to
+
+
+def load_image(source, min_size: tuple[int, int] | None = None) -> Image.Image:
+    """
+    Open an image, decoding it at the lowest resolution that still covers `min_size` (w, h).
+    Uses a large enough EXIF thumbnail when one exists, otherwise JPEG DCT scaling (draft mode),
+    which decodes at 1/2, 1/4 or 1/8 scale. Other formats are decoded at full resolution.
+    """
+    if isinstance(source, str):
+        source = take_prefetched(source) or source
+    image = Image.open(source)
+    if min_size is None or image.format != "JPEG":
+        return image
+
+    thumbnail = _load_exif_thumbnail(image, min_size)
+    if thumbnail is not None:
+        image.close()
+        return thumbnail
+
+    image.draft("RGB", min_size)
+    return image
+
+
+def _load_exif_thumbnail(image: Image.Image, min_size: tuple[int, int]) -> Image.Image | None:
+    raw = image.info.get("exif")
+    if not raw:
+        return None
+    try:
+        ifd1 = image.getexif().get_ifd(ExifTags.IFD.IFD1)
+        offset = ifd1.get(_EXIF_THUMBNAIL_OFFSET)
+        length = ifd1.get(_EXIF_THUMBNAIL_LENGTH)
+        if not offset or not length:
+            return None
+        start = _EXIF_HEADER_SIZE + offset
+        thumbnail = Image.open(io.BytesIO(raw[start:start + length]))
+    except Exception:
+        return None
+
+    w, h = image.size
+    tw, th = thumbnail.size
+    # Thumbnails are often letterboxed or a fixed size, only use one with the same framing
+    same_aspect = abs(tw / th - w / h) <= 0.01 * (w / h)
+    large_enough = min(tw, th) >= min(min_size) and max(tw, th) >= max(min_size)
+    if same_aspect and large_enough:
+        return thumbnail
+    thumbnail.close()
+    return None
+
 
 def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float):
     """Simple NMS in NumPy."""
@@ -73,8 +130,10 @@ def draw_boxes(
     return image
 
 
-def crop_faces(image: Image.Image, boxes: np.ndarray, scores: np.ndarray, conf_threshold: float = 0.5, nms_threshold: float = 0.3):
-    img_w, img_h = image.size
+def crop_faces(image: Image.Image | np.ndarray, boxes: np.ndarray, scores: np.ndarray, conf_threshold: float = 0.5, nms_threshold: float = 0.3):
+    """Crop detected faces; for a HWC array the crops are views into it rather than copies."""
+    is_array = isinstance(image, np.ndarray)
+    img_w, img_h = (image.shape[1], image.shape[0]) if is_array else image.size
     keep_indices = np.where(scores >= conf_threshold)[0]
     if keep_indices.size == 0:
         return []
@@ -85,5 +144,169 @@ def crop_faces(image: Image.Image, boxes: np.ndarray, scores: np.ndarray, conf_t
     keep_nms = nms(boxes_px, scores_keep, nms_threshold)
     filtered_boxes = boxes_px[keep_nms]
 
+    if is_array:
+        return [_crop_array(image, box) for box in filtered_boxes]
     cropped_faces = [image.crop((x1, y1, x2, y2)) for (x1, y1, x2, y2) in filtered_boxes]
     return cropped_faces
+
+
+def _crop_array(image: np.ndarray, box: np.ndarray) -> np.ndarray:
+    # Same result as PIL's crop: a view when the box is inside the image, otherwise a copy
+    # with the outside area filled with zeros
+    x1, y1, x2, y2 = (int(v) for v in box)
+    if x2 < x1 or y2 < y1:
+        raise ValueError("Coordinate 'right' is less than 'left'" if x2 < x1 else "Coordinate 'lower' is less than 'upper'")
+    img_h, img_w = image.shape[:2]
+    if x1 >= 0 and y1 >= 0 and x2 <= img_w and y2 <= img_h:
+        return image[y1:y2, x1:x2]
+    crop = np.zeros((y2 - y1, x2 - x1, *image.shape[2:]), dtype=image.dtype)
+    sx1, sy1, sx2, sy2 = max(x1, 0), max(y1, 0), min(x2, img_w), min(y2, img_h)
+    if sx2 > sx1 and sy2 > sy1:
+        crop[sy1 - y1:sy2 - y1, sx1 - x1:sx2 - x1] = image[sy1:sy2, sx1:sx2]
+    return crop
+
+
+def image_size(image: Image.Image | np.ndarray) -> tuple[int, int]:
+    """(w, h) of a PIL image, a HW array or a (N)HWC array."""
+    if not isinstance(image, np.ndarray):
+        return image.size
+    return (image.shape[1], image.shape[0]) if image.ndim == 2 else (image.shape[-2], image.shape[-3])
+
+
+def to_rgb_array(image: np.ndarray) -> np.ndarray:
+    """View a uint8 HW or (N)HWC (1, 3 or 4 channel) array as RGB, copying only when channels must change."""
+    if image.ndim == 2:
+        return np.repeat(image[:, :, None], 3, axis=2)
+    if image.shape[-1] == 3:
+        return image
+    if image.shape[-1] == 4:
+        return image[..., :3]
+    if image.shape[-1] == 1:
+        return np.repeat(image, 3, axis=-1)
+    raise SmartScanError("Unsupported number of image channels", code=ErrorCode.INVALID_ARGUMENT, details=str(image.shape))
+
+
+def shrink_to_cover(image: Image.Image | np.ndarray, size: tuple[int, int]) -> np.ndarray:
+    """
+    uint8 HWC RGB array downscaled to the smallest size that still covers `size` (w, h),
+    keeping the aspect ratio. Images already that small are only converted.
+    """
+    is_array = isinstance(image, np.ndarray)
+    w, h = image_size(image)
+    scale = max(size[0] / w, size[1] / h)
+    if scale >= 1:
+        return to_rgb_array(image) if is_array else np.asarray(image.convert("RGB"))
+    new_size = (max(size[0], round(w * scale)), max(size[1], round(h * scale)))
+    if is_array:
+        return np.round(resize_array(image, new_size)).astype(np.uint8)
+    return np.asarray(image.convert("RGB").resize(new_size, Image.BICUBIC, reducing_gap=3.0))
+
+
+def resize_crop(image: Image.Image | np.ndarray, size: tuple[int, int], box: tuple[int, int, int, int] | None = None) -> np.ndarray:
+    """
+    float32 (N)HWC RGB values in [0, 255] of `image` resized to `size` (w, h) with bicubic
+    filtering, then cropped to `box`. Arrays go through `resize_array` in one pass without
+    a PIL round trip.
+    """
+    if isinstance(image, np.ndarray):
+        return resize_array(image, size, box)
+    image = image.convert("RGB").resize(size, Image.BICUBIC)
+    if box is not None:
+        image = image.crop(box)
+    return np.asarray(image, dtype=np.float32)
+
+
+def preprocess_batch(images: list[Image.Image | np.ndarray] | np.ndarray, preprocess: Callable[[Image.Image | np.ndarray], np.ndarray]) -> np.ndarray:
+    """Concatenated model inputs for a list of images; a NHWC array is preprocessed as a whole."""
+    if isinstance(images, np.ndarray) and images.ndim == 4:
+        return preprocess(images)
+    return np.concatenate([preprocess(image) for image in images], axis=0)
+
+
+def resize_array(image: np.ndarray, size: tuple[int, int], box: tuple[int, int, int, int] | None = None) -> np.ndarray:
+    """
+    Resize a HW or HWC uint8 array, or a NHWC batch of same sized frames, to `size` (w, h) with
+    antialiased bicubic filtering, matching PIL's `resize(size, Image.BICUBIC)` up to
+    rounding. With `box` (left, top, right, bottom in output pixels) only that region is
+    computed, e.g. the centre crop. Large downscales first average integer blocks, then the
+    separable filter is applied one axis at a time with taps placed in original pixel
+    coordinates. Returns float32 (N)HWC values in [0, 255].
+    """
+    image = to_rgb_array(image)
+    out_w, out_h = size
+    left, top, right, bottom = box or (0, 0, out_w, out_h)
+    w, h = image_size(image)
+
+    # Block averaging is cheap and loses little as long as the remaining scale is at least 2x
+    factor = max(1, min(w // out_w, h // out_h) // 2)
+    pixels = _block_mean(image, factor) if factor > 1 else image
+
+    resized = _resample_axis(pixels, h, out_h, top, bottom, factor, axis=-3)
+    resized = _resample_axis(resized, w, out_w, left, right, factor, axis=-2)
+    return np.clip(resized, 0, 255, out=resized)
+
+
+def _block_mean(image: np.ndarray, factor: int) -> np.ndarray:
+    # Strided slice sums are much faster than reducing a (h, f, w, f, c) reshape. A partial
+    # last block is completed with the edge row/column so block i still covers pixels [i*f, (i+1)*f)
+    dtype = np.uint16 if factor * factor * 255 <= np.iinfo(np.uint16).max else np.uint32
+    rows = _block_slice(image, 0, factor, axis=-3).astype(dtype)
+    for i in range(1, factor):
+        rows += _block_slice(image, i, factor, axis=-3)
+    pixels = _block_slice(rows, 0, factor, axis=-2).astype(np.float32)
+    for j in range(1, factor):
+        pixels += _block_slice(rows, j, factor, axis=-2)
+    pixels *= 1.0 / (factor * factor)
+    return pixels
+
+
+def _block_slice(pixels: np.ndarray, offset: int, factor: int, axis: int) -> np.ndarray:
+    n_blocks = -(-pixels.shape[axis] // factor)
+    index = [slice(None)] * pixels.ndim
+    index[axis] = slice(offset, None, factor)
+    part = pixels[tuple(index)]
+    if part.shape[axis] < n_blocks:
+        index[axis] = slice(-1, None)
+        part = np.concatenate([part, pixels[tuple(index)]], axis=axis)
+    return part
+
+
+def _resample_axis(pixels: np.ndarray, in_size: int, out_size: int, start: int, stop: int, factor: int, axis: int) -> np.ndarray:
+    indices, weights = _resample_taps(in_size, out_size, start, stop, factor)
+    shape = [1] * pixels.ndim
+    shape[axis] = len(weights)
+    result = None
+    # One gather and multiply-add per filter tap; only a handful of taps are non-zero
+    for tap in range(weights.shape[1]):
+        contribution = np.take(pixels, indices[:, tap], axis=axis) * weights[:, tap].reshape(shape)
+        if result is None:
+            result = contribution.astype(np.float32, copy=False)
+        else:
+            result += contribution
+    return result
+
+
+def _resample_taps(in_size: int, out_size: int, start: int, stop: int, factor: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Bicubic (a = -0.5) filter, widened when downscaling to antialias, as (indices, weights)
+    per output pixel. Centres and support come from the original `in_size`, then are
+    expressed in units of `factor` pixel blocks, so block averaging does not shift the image.
+    """
+    scale = in_size / out_size
+    support_scale = max(scale, 1.0) / factor
+    support = 2.0 * support_scale
+    centers = (np.arange(start, stop) + 0.5) * scale / factor
+    first = np.floor(centers - support).astype(np.int64)
+    n_taps = int(np.ceil(2 * support)) + 1
+    indices = first[:, None] + np.arange(n_taps)[None, :]
+    distances = np.abs(indices + 0.5 - centers[:, None]) / support_scale
+    a = -0.5
+    weights = np.where(
+        distances < 1, ((a + 2) * distances - (a + 3)) * distances ** 2 + 1,
+        np.where(distances < 2, (((distances - 5) * distances + 8) * distances - 4) * a, 0.0),
+    )
+    # Taps outside the image carry no weight, like PIL's clipped filter window
+    n_blocks = -(-in_size // factor)
+    weights[(indices < 0) | (indices >= n_blocks)] = 0.0
+    weights /= weights.sum(axis=1, keepdims=True)
+    return np.clip(indices, 0, n_blocks - 1), weights.astype(np.float32)
@@ -0,0 +1,254 @@
+import io
+import os
+import time
+import threading
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import IO, Callable, Iterable
+
+_QUEUED = 0
+_READING = 1
+_DONE = 2
+
+
+@dataclass
+class PrefetchStats:
+    # Files handed out from memory, including those the consumer waited for
+    hits: int = 0
+    # Queued files the consumer read itself because the I/O threads had not started them
+    misses: int = 0
+    bytes_read: int = 0
+    # Time spent reading on the I/O threads
+    read_time: float = 0.0
+    # Time consumers were blocked on file data: waiting for a read in flight or reading a miss
+    io_wait: float = 0.0
+
+
+class _Entry():
+    __slots__ = ("path", "hint_only", "state", "size", "data", "discarded")
+
+    def __init__(self, path: str, hint_only: bool = False):
+        self.path = path
+        self.hint_only = hint_only
+        self.state = _QUEUED
+        self.size: int | None = None
+        self.data: bytes | None = None
+        self.discarded = False
+
+
+class FilePrefetcher():
+    """
+    Reads upcoming files into memory on a dedicated I/O thread pool, ahead of the stage that
+    decodes them, so slow storage (network shares, spinning disks) overlaps with compute.
+
+    Files are read in the order they were queued while the bytes held in memory stay within
+    `max_bytes`; a buffer's bytes count until its consumer takes it. Files larger than
+    `max_file_bytes`, and files queued as hint only (e.g. videos, which ffmpeg reads by
+    path), are not buffered, only hinted to the kernel with `posix_fadvise` where available.
+    Consumers get an in-memory buffer from `take`, or None when the file was not buffered,
+    in which case they open the path as usual.
+    """
+    def __init__(self, max_bytes: int = 256 << 20, io_threads: int = 4, max_file_bytes: int = 8 << 20):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = min(max_file_bytes, max_bytes)
+        self.io_threads = io_threads
+        self.stats = PrefetchStats()
+        self._entries: dict[str, _Entry] = {}
+        self._queue: deque[_Entry] = deque()
+        self._held = 0
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._closed = False
+
+    def prefetch(self, paths: Iterable[str], hint_only: Callable[[str], bool] | None = None):
+        """
+        Queue files for reading, after any already queued. Paths already queued are ignored.
+        Paths for which `hint_only` returns True are only hinted, whatever their size.
+        """
+        with self._cond:
+            for path in paths:
+                if path in self._entries:
+                    continue
+                entry = _Entry(path, hint_only is not None and hint_only(path))
+                self._entries[path] = entry
+                self._queue.append(entry)
+            self._ensure_threads()
+            self._cond.notify_all()
+
+    def take(self, path: str) -> io.BytesIO | None:
+        """
+        Hand over the contents of a queued file, waiting for a read in flight. A file not
+        started yet is read by the caller. Returns None when the file is not queued, too
+        large to buffer, or could not be read, so the caller opens it and reports errors itself.
+        """
+        with self._cond:
+            entry = self._entries.pop(path, None)
+            if entry is None:
+                return None
+            if entry.state == _QUEUED:
+                self._queue.remove(entry)
+            elif entry.state == _READING:
+                start = time.perf_counter()
+                while entry.state != _DONE:
+                    self._cond.wait()
+                self.stats.io_wait += time.perf_counter() - start
+            if entry.state == _DONE:
+                data = entry.data
+                self._release(entry)
+                if data is None:
+                    return None
+                self.stats.hits += 1
+                return io.BytesIO(data)
+
+        start = time.perf_counter()
+        data = None if self._too_large(entry) else self._read(path, hint_only=False)
+        with self._cond:
+            self.stats.io_wait += time.perf_counter() - start
+            if data is not None:
+                self.stats.misses += 1
+                self.stats.bytes_read += len(data)
+        return io.BytesIO(data) if data is not None else None
+
+    def discard(self, path: str):
+        """Drop a file that will not be consumed (e.g. its item failed before reading it)."""
+        with self._cond:
+            entry = self._entries.pop(path, None)
+            if entry is None:
+                return
+            if entry.state == _QUEUED:
+                self._queue.remove(entry)
+            elif entry.state == _READING:
+                entry.discarded = True
+            else:
+                self._release(entry)
+
+    def clear(self):
+        """Drop everything queued or held; reads in flight finish and are dropped."""
+        with self._cond:
+            for path in list(self._entries):
+                self.discard(path)
+
+    def close(self):
+        with self._cond:
+            self.clear()
+            self._closed = True
+            threads, self._threads = self._threads, []
+            self._cond.notify_all()
+        for thread in threads:
+            thread.join()
+
+    @property
+    def held_bytes(self) -> int:
+        return self._held
+
+    def _ensure_threads(self):
+        self._closed = False
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        for i in range(len(self._threads), self.io_threads):
+            thread = threading.Thread(target=self._run, name=f"smartscan-prefetch-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _release(self, entry: _Entry):
+        if entry.data is not None:
+            self._held -= len(entry.data)
+            entry.data = None
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                entry = self._next_entry()
+                if entry is None:
+                    return
+                entry.state = _READING
+
+            start = time.perf_counter()
+            hint_only = self._too_large(entry)
+            data = self._read(entry.path, hint_only)
+            elapsed = time.perf_counter() - start
+
+            with self._cond:
+                self.stats.read_time += elapsed
+                entry.state = _DONE
+                read = len(data) if data is not None else 0
+                self.stats.bytes_read += read
+                if not hint_only:
+                    # The size reserved for the file is replaced by what was actually read
+                    self._held += read - entry.size
+                if entry.discarded:
+                    self._held -= read
+                else:
+                    entry.data = data
+                self._cond.notify_all()
+
+    def _next_entry(self) -> _Entry | None:
+        # Called with the lock held; waits until the next file fits in the byte budget
+        while not self._closed:
+            if self._queue:
+                entry = self._queue[0]
+                if self._too_large(entry):
+                    # Hinted, not buffered, so it takes no budget
+                    return self._queue.popleft()
+                # A file bigger than the free budget still goes once nothing else is held
+                if self._held == 0 or self._held + entry.size <= self.max_bytes:
+                    self._held += entry.size
+                    return self._queue.popleft()
+            self._cond.wait()
+        return None
+
+    def _too_large(self, entry: _Entry) -> bool:
+        if entry.hint_only:
+            return True
+        if entry.size is None:
+            try:
+                entry.size = os.path.getsize(entry.path)
+            except OSError:
+                # Read anyway so the consumer gets the error from opening the file
+                entry.size = 0
+        return entry.size > self.max_file_bytes
+
+    def _read(self, path: str, hint_only: bool) -> bytes | None:
+        try:
+            with open(path, "rb", buffering=0) as file:
+                if hasattr(os, "posix_fadvise"):
+                    fd = file.fileno()
+                    if hint_only:
+                        # Let the kernel start reading the head of the file into the page cache
+                        os.posix_fadvise(fd, 0, self.max_file_bytes, os.POSIX_FADV_WILLNEED)
+                        return None
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                elif hint_only:
+                    return None
+                return file.read()
+        except OSError:
+            return None
+
+
+_current_prefetcher: ContextVar[FilePrefetcher | None] = ContextVar("smartscan_prefetcher", default=None)
+
+
+def current_prefetcher() -> FilePrefetcher | None:
+    return _current_prefetcher.get()
+
+
+def set_current_prefetcher(prefetcher: FilePrefetcher | None):
+    _current_prefetcher.set(prefetcher)
+
+
+def take_prefetched(path: str) -> io.BytesIO | None:
+    """The prefetched contents of `path` for the current item, or None to read it from disk."""
+    prefetcher = _current_prefetcher.get()
+    return prefetcher.take(path) if prefetcher is not None else None
+
+
+def open_input(path: str, mode: str = "rb", encoding: str | None = None, errors: str | None = None) -> IO:
+    """`open` for input files, served from the current prefetcher's buffer when it holds the file."""
+    buffer = take_prefetched(path)
+    if buffer is None:
+        return open(path, mode, encoding=encoding, errors=errors) if "b" not in mode else open(path, mode)
+    if "b" in mode:
+        return buffer
+    return io.TextIOWrapper(buffer, encoding=encoding, errors=errors)
@@ -0,0 +1,123 @@
+import os
+import numpy as np
+from typing import Iterator
+from tokenizers import Tokenizer
+
+from smartscan.utils.prefetch import open_input
+
+
+def iter_text_blocks(filepath: str, block_size: int = 1 << 16) -> Iterator[str]:
+    """Read a text file incrementally, `block_size` characters at a time."""
+    with open_input(filepath, 'r', encoding='utf-8', errors='replace') as file:
+        while True:
+            block = file.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+def iter_token_chunks(filepath: str, tokenizer: Tokenizer, max_tokens: int, overlap: int = 0, block_size: int = 1 << 16) -> Iterator[str]:
+    """
+    Stream a text file as chunks of at most `max_tokens` tokens. Chunks end at word
+    boundaries, so a chunk re-tokenized on its own gives the same tokens rather than
+    stray "##" pieces that could push it past the model's limit. Chunk boundaries come from
+    the tokenizer's character offsets, so only the current block and an unfinished window
+    are ever held in memory.
+    """
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+    carry = ""
+    blocks = iter_text_blocks(filepath, block_size)
+    block = next(blocks, None)
+
+    while block is not None:
+        next_block = next(blocks, None)
+        is_last = next_block is None
+        text = carry + block
+        encoding = tokenizer.encode(text, add_special_tokens=False)
+        offsets = encoding.offsets
+        n_final = len(offsets)
+        word_ids = encoding.word_ids
+
+        # The last word may continue in the next block, so its tokens are not final yet
+        if not is_last and n_final > 0:
+            last_word = word_ids[-1]
+            while n_final > 0 and word_ids[n_final - 1] == last_word:
+                n_final -= 1
+            # A single unbroken "word" spanning several blocks is cut anyway to keep memory bounded
+            if n_final == 0 and len(text) > 4 * block_size:
+                n_final = len(offsets)
+
+        start = 0
+        while start < n_final:
+            end = start + max_tokens
+            if end > n_final:
+                if not is_last:
+                    break
+                end = n_final
+            else:
+                end = _word_end(word_ids, start, end)
+            yield text[offsets[start][0]:offsets[end - 1][1]]
+            if is_last and end == n_final:
+                start = n_final
+                break
+            start = _word_start(word_ids, start + 1, end - overlap) if overlap else end
+
+        carry = text[offsets[start][0]:] if start < len(offsets) else ""
+        block = next_block
+
+
+def sample_token_chunks(filepath: str, tokenizer: Tokenizer, max_tokens: int, n_chunks: int, overlap: int = 0) -> list[str]:
+    """
+    Return up to `n_chunks` token windows spread evenly across the file.
+    Large files are sampled by seeking to evenly spaced byte offsets, so only
+    `n_chunks` small reads are made regardless of file size.
+    """
+    # Generous upper bound on bytes needed for one window (long tokens, multibyte chars)
+    read_size = max_tokens * 32
+    size = os.path.getsize(filepath)
+
+    if size <= n_chunks * read_size:
+        chunks = list(iter_token_chunks(filepath, tokenizer, max_tokens, overlap))
+        if len(chunks) <= n_chunks:
+            return chunks
+        indices = np.linspace(0, len(chunks) - 1, n_chunks).round().astype(int)
+        return [chunks[i] for i in indices]
+
+    chunks = []
+    with open_input(filepath, 'rb') as file:
+        for position in np.linspace(0, size - read_size, n_chunks).astype(int):
+            file.seek(position)
+            text = file.read(read_size).decode('utf-8', errors='ignore')
+            # Skip the partial word at the seek position and the one cut off at the end of the read
+            if position > 0:
+                boundary = next((i for i, c in enumerate(text) if c.isspace()), len(text))
+                text = text[boundary:]
+            encoding = tokenizer.encode(text, add_special_tokens=False)
+            offsets = encoding.offsets
+            if not offsets:
+                continue
+            end = min(max_tokens, len(offsets) - 1) if len(offsets) > 1 else 1
+            end = _word_end(encoding.word_ids, 0, end)
+            chunks.append(text[offsets[0][0]:offsets[end - 1][1]])
+    return chunks
+
+
+def _word_end(word_ids: list[int | None], start: int, end: int) -> int:
+    # Move a chunk end back so it does not split a word
+    boundary = end
+    while boundary > start + 1 and _splits_word(word_ids, boundary):
+        boundary -= 1
+    # A window that is all one word is cut anyway
+    return end if _splits_word(word_ids, boundary) else boundary
+
+
+def _splits_word(word_ids: list[int | None], index: int) -> bool:
+    return 0 < index < len(word_ids) and word_ids[index] is not None and word_ids[index] == word_ids[index - 1]
+
+
+def _word_start(word_ids: list[int | None], lowest: int, start: int) -> int:
+    # Move an overlapping chunk start back to the beginning of its word
+    while start > lowest and _splits_word(word_ids, start):
+        start -= 1
+    return start
@@ -0,0 +1,90 @@
+import re
+import subprocess
+import numpy as np
+from typing import Iterator
+
+from smartscan.utils.cancellation import cancellable_process, communicate
+
+
+def probe_video(video_path: str) -> tuple[int, int, float]:
+    """Return (width, height, duration in seconds) of a video."""
+    proc = subprocess.Popen(["ffmpeg", "-i", video_path], stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+    _, err = communicate(proc)
+    err = err.decode(errors="replace")
+
+    match = re.search(r", (\d+)x(\d+)", err)
+    if not match:
+        raise ValueError("Could not determine video dimensions")
+    width, height = int(match.group(1)), int(match.group(2))
+
+    match_dur = re.search(r"Duration: (\d+):(\d+):(\d+\.\d+)", err)
+    if not match_dur:
+        raise ValueError("Could not determine video duration")
+    hours, minutes, seconds = map(float, match_dur.groups())
+    return width, height, hours*3600 + minutes*60 + seconds
+
+
+def iter_video_frames(video_path: str, fps: float, min_size: tuple[int, int] | None = None, probe: tuple[int, int, float] | None = None) -> Iterator[tuple[float, np.ndarray]]:
+    """
+    Stream (timestamp, frame) pairs sampled at `fps` from one FFmpeg process, holding a single
+    frame at a time. With `min_size` (w, h) FFmpeg downscales frames to the smallest size that
+    still covers it, keeping the aspect ratio. Frames are (H, W, 3) uint8 arrays.
+    """
+    width, height, _ = probe or probe_video(video_path)
+    out_width, out_height = _scaled_size(width, height, min_size)
+    filters = f"fps={fps}"
+    if (out_width, out_height) != (width, height):
+        filters += f",scale={out_width}:{out_height}"
+
+    cmd = [
+        "ffmpeg",
+        "-i", video_path,
+        "-vf", filters,
+        "-f", "image2pipe",
+        "-pix_fmt", "rgb24",
+        "-vcodec", "rawvideo",
+        "-"
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    frame_size = out_width * out_height * 3
+    try:
+        # A cancelled token kills FFmpeg, which ends the read loop and raises a timeout
+        with cancellable_process(proc):
+            index = 0
+            while True:
+                raw = proc.stdout.read(frame_size)
+                if len(raw) < frame_size:
+                    break
+                yield index / fps, np.frombuffer(raw, dtype=np.uint8).reshape((out_height, out_width, 3))
+                index += 1
+    finally:
+        # Consumers may stop early, e.g. once a frame budget is used up
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+
+def frame_signature(frame: np.ndarray, grid: int = 16) -> np.ndarray:
+    """Tiny grayscale thumbnail (grid x grid, values in [0, 1]) used for cheap frame comparison."""
+    gray = frame.mean(axis=2) if frame.ndim == 3 else frame.astype(np.float32)
+    height, width = gray.shape
+    cell_h, cell_w = max(1, height // grid), max(1, width // grid)
+    rows, cols = min(grid, height // cell_h), min(grid, width // cell_w)
+    cells = gray[:rows * cell_h, :cols * cell_w].reshape(rows, cell_h, cols, cell_w)
+    return (cells.mean(axis=(1, 3)) / 255.0).astype(np.float32)
+
+
+def frame_difference(a: np.ndarray, b: np.ndarray) -> float:
+    """Mean absolute difference between two frame signatures, 0 for identical frames."""
+    return float(np.abs(a - b).mean())
+
+
+def _scaled_size(width: int, height: int, min_size: tuple[int, int] | None) -> tuple[int, int]:
+    if min_size is None:
+        return width, height
+    scale = max(min_size[0] / width, min_size[1] / height)
+    if scale >= 1:
+        return width, height
+    # Even dimensions keep FFmpeg's scaler happy for chroma subsampled sources
+    return max(2, int(np.ceil(width * scale / 2)) * 2), max(2, int(np.ceil(height * scale / 2)) * 2)